@@ -1,6 +1,16 @@
+import argparse
 import csv
 import sys
+import time
 
+import service
+from delta import Delta, apply_delta, patch_snapshot
+from graph import MoviesView, NamesView, PeopleView, load_compact
+from ingest import format_stats
+from landmarks import load_or_build
+from nameindex import NameIndex
+from snapshot import (load_name_index, load_snapshot, save_snapshot,
+                      source_stats)
 from util import Node, StackFrontier, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
@@ -12,55 +22,201 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# CompactGraph backing the dicts above, when loaded with compact=True
+graph = None
 
-def load_data(directory):
+# LandmarkIndex over `graph` used to bound and prune searches, if loaded
+landmark_index = None
+
+# Paths already answered by the batch and server modes
+path_cache = service.PathCache()
+
+# NameIndex over `people`, loaded with the snapshot or built by
+# build_name_index (or on first use by resolve_name), and kept up to date
+# by deltas
+name_index = None
+
+
+def load_data(directory, compact=False, snapshot=True, stats=None):
     """
     Load data from CSV files into memory.
+
+    With `compact`, the data is held in an integer-indexed CSR graph and
+    `names`, `people` and `movies` become read-only views over it. Unless
+    `snapshot` is False, the graph is memory-mapped from a binary snapshot
+    beside the CSVs, which is (re)written whenever it is missing or stale,
+    and the name index is loaded from (or saved in) the snapshot too.
+    Without `compact`, the CSVs are parsed on every call.
+
+    If `stats` is a dict, it is filled with the (rows, seconds) taken to
+    parse each CSV.
     """
+    global name_index
+    name_index = None
+    if compact:
+        global graph, names, people, movies
+        graph = load_snapshot(directory) if snapshot else None
+        if graph is not None:
+            name_index = load_name_index(directory, graph)
+        else:
+            sources = source_stats(directory)
+            graph = load_compact(directory, stats)
+            if snapshot:
+                try:
+                    name_index = save_snapshot(directory, graph, sources)
+                except OSError as e:
+                    print(f"Could not write snapshot: {e}", file=sys.stderr)
+        names = NamesView(graph)
+        people = PeopleView(graph)
+        movies = MoviesView(graph)
+        return
+
     # Load people
+    started = time.perf_counter()
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
+        reader = csv.reader(f)
+        next(reader)
         for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
+            if not row:
+                continue
+            person_id, name, birth = row
+            people[person_id] = {
+                "name": name,
+                "birth": birth,
                 "movies": set()
             }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
+            if name.lower() not in names:
+                names[name.lower()] = {person_id}
             else:
-                names[row["name"].lower()].add(row["id"])
+                names[name.lower()].add(person_id)
+    started = record(stats, "people.csv", len(people), started)
 
     # Load movies
     with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
+        reader = csv.reader(f)
+        next(reader)
         for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
+            if not row:
+                continue
+            movie_id, title, year = row
+            movies[movie_id] = {
+                "title": title,
+                "year": year,
                 "stars": set()
             }
+    started = record(stats, "movies.csv", len(movies), started)
 
     # Load stars
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
+        reader = csv.reader(f)
+        next(reader)
+        rows = 0
         for row in reader:
+            if not row:
+                continue
+            person_id, movie_id = row
+            rows += 1
             try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
+                people[person_id]["movies"].add(movie_id)
+                movies[movie_id]["stars"].add(person_id)
             except KeyError:
                 pass
+    record(stats, "stars.csv", rows, started)
+
+
+def record(stats, name, rows, started):
+    """
+    Records in `stats` (if not None) that `rows` rows of `name` were
+    parsed since `started`, and returns the current time.
+    """
+    now = time.perf_counter()
+    if stats is not None:
+        stats[name] = (rows, now - started)
+    return now
+
+
+def update_data(directory, delta_directory):
+    """
+    Applies the delta in `delta_directory` (see delta.py) to the data
+    loaded from `directory`, and to the snapshot of `directory` if any.
+    """
+    delta = Delta.read(delta_directory)
+    apply_delta(sys.modules[__name__], delta)
+    patch_snapshot(directory, delta)
+
+
+def load_landmarks(path, k=16):
+    """
+    Loads the landmark index at `path` for the compact graph, building
+    it with `k` landmarks if it is missing or stale.
+    """
+    global landmark_index
+    landmark_index = load_or_build(path, graph, k)
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        usage="python degrees.py [directory] [--compact [--no-snapshot]] "
+              "[--batch FILE | --serve [HOST:]PORT | --socket PATH]"
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--compact", action="store_true",
+                        help="hold the data in a compact CSR graph, loaded "
+                             "from a snapshot beside the CSVs after the "
+                             "first run (without --compact, the CSVs are "
+                             "parsed on every run)")
+    parser.add_argument("--no-snapshot", dest="snapshot",
+                        action="store_false",
+                        help="with --compact, always parse the CSVs")
+    parser.add_argument("--landmarks", metavar="FILE",
+                        help="with --compact, bound and prune searches with "
+                             "the landmark index in FILE, building it if "
+                             "needed")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--batch", metavar="FILE",
+                      help="answer tab-separated or JSON name pairs from "
+                           "FILE ('-' for stdin) as JSON lines")
+    mode.add_argument("--serve", metavar="[HOST:]PORT",
+                      help="answer queries over HTTP")
+    mode.add_argument("--socket", metavar="PATH",
+                      help="answer queries over HTTP on a Unix socket")
+    args = parser.parse_args()
+    if args.landmarks and not args.compact:
+        parser.error("--landmarks requires --compact")
+    if not args.snapshot and not args.compact:
+        parser.error("--no-snapshot requires --compact")
+    interactive = not (args.batch or args.serve or args.socket)
 
     # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+    log = sys.stdout if interactive else sys.stderr
+    print("Loading data...", file=log)
+    stats = {}
+    load_data(args.directory, compact=args.compact, snapshot=args.snapshot,
+              stats=stats)
+    for line in format_stats(stats):
+        print(line, file=sys.stderr)
+    if args.landmarks:
+        load_landmarks(args.landmarks)
+    if not interactive and name_index is None:
+        # Built up front, so no query waits for it
+        started = time.perf_counter()
+        build_name_index()
+        print(f"Name index: {len(name_index.keys)} names in "
+              f"{time.perf_counter() - started:.2f}s", file=sys.stderr)
+    print("Data loaded.", file=log)
+
+    # Queries are answered against this module's (possibly __main__) data
+    this = sys.modules[__name__]
+    if args.batch:
+        if args.batch == "-":
+            service.run_batch(this, sys.stdin, sys.stdout)
+        else:
+            with open(args.batch, encoding="utf-8") as f:
+                service.run_batch(this, f, sys.stdout)
+        return
+    if args.serve or args.socket:
+        service.serve(this, address=args.serve, socket_path=args.socket)
+        return
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -69,7 +225,10 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    stats = {}
+    path = shortest_path(source, target, stats)
+    if landmark_index is not None:
+        report_pruning(stats)
 
     if path is None:
         print("Not connected.")
@@ -84,39 +243,100 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def report_pruning(stats):
+    """
+    Prints the landmark bounds and pruning counts of a compact search.
+    """
+    if "lower" not in stats:
+        return
+    if stats["lower"] is None:
+        print("Landmarks: not connected.")
+        return
+    upper = stats["upper"] if stats["upper"] is not None else "?"
+    print(f"Landmarks: between {stats['lower']} and {upper} degrees.")
+    if "reached" in stats:
+        reached = stats["reached"] + stats["pruned"]
+        print(f"Landmarks: pruned {stats['pruned']} "
+              f"of {reached} people reached.")
+
+
+def shortest_path(source, target, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
     """
-    if source==target:
+    if source == target:
         return None
-    visited=[]
-    tracklist=[[(None,source)]]
-    while tracklist:
-        track_sofar=tracklist.pop(0)
-        if len(track_sofar)==0:
-            return None
-        _, moviestar=track_sofar[-1]
-        neighbors=neighbors_for_person(moviestar)
-        for (movie,star) in neighbors:
-            if star not in visited:
-                newtrack=list(track_sofar)
-                newtrack.append((movie,star))
-                tracklist.append(newtrack)
-                if star==target:
-                    newtrack.pop(0)
-                    return newtrack
-        visited.append(moviestar)        
-                
-    
-   
-        
-        
-
-   
+    if graph is not None:
+        return graph.shortest_path(source, target, landmark_index, stats)
+
+    # Parent pointers for each side of the search: the forward side maps a
+    # person to the (movie_id, person_id) step that reached it from the
+    # source, the backward side to the step that leads on towards the target
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    while forward_frontier and backward_frontier:
+
+        # Always grow the smaller frontier by one full layer
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = expand_layer(
+                forward_frontier, forward, backward
+            )
+        else:
+            backward_frontier, meeting = expand_layer(
+                backward_frontier, backward, forward
+            )
+
+        if meeting is not None:
+            return join_paths(meeting, forward, backward)
+
+    return None
+
+
+def expand_layer(frontier, parents, others):
+    """
+    Expands every person in `frontier` by one step, recording parent
+    pointers in `parents`.
+
+    Returns the next frontier and the first person also reached by the
+    other side of the search (or None if the two sides have not met).
+    """
+    next_frontier = []
+    for person_id in frontier:
+        for movie_id, star_id in neighbors_for_person(person_id):
+            if star_id in parents:
+                continue
+            parents[star_id] = (movie_id, person_id)
+            if star_id in others:
+                return next_frontier, star_id
+            next_frontier.append(star_id)
+    return next_frontier, None
+
+
+def join_paths(meeting, forward, backward):
+    """
+    Builds the (movie_id, person_id) path through `meeting` from the
+    parent pointers of both sides of a bidirectional search.
+    """
+    path = []
+    person_id = meeting
+    while forward[person_id] is not None:
+        movie_id, parent_id = forward[person_id]
+        path.append((movie_id, person_id))
+        person_id = parent_id
+    path.reverse()
+
+    person_id = meeting
+    while backward[person_id] is not None:
+        movie_id, next_id = backward[person_id]
+        path.append((movie_id, next_id))
+        person_id = next_id
+    return path
 
 
 def person_id_for_name(name):
@@ -124,7 +344,7 @@ def person_id_for_name(name):
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    person_ids = person_ids_for_name(name)
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
@@ -145,11 +365,41 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def person_ids_for_name(name):
+    """
+    Returns the list of IMDB ids of every person with a given name.
+    """
+    return list(names.get(name.lower(), set()))
+
+
+def resolve_name(query, limit=10):
+    """
+    Returns up to `limit` IMDB ids of people whose name matches `query`
+    exactly, by prefix, or approximately, best match first.
+    """
+    if name_index is None:
+        build_name_index()
+    return name_index.resolve(query, limit)
+
+
+def build_name_index():
+    """
+    Builds the NameIndex used by resolve_name over the loaded data.
+    """
+    global name_index
+    if graph is not None:
+        name_index = NameIndex.from_graph(graph)
+    else:
+        name_index = NameIndex.from_people(people)
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors_for_person(person_id)
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
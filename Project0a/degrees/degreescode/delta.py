@@ -0,0 +1,298 @@
+"""
+Incremental updates to the degrees dataset.
+
+A delta is a directory holding any of these CSV files, each with a header
+row like the dataset's own files:
+
+    people.csv          id,name,birth         people to add or update
+    movies.csv          id,title,year         movies to add or update
+    stars.csv           person_id,movie_id    credits to add
+    merged_people.csv   id,into_id            people merged into another
+    deleted_stars.csv   person_id,movie_id    credits to remove
+    deleted_movies.csv  id                    movies to remove
+    deleted_people.csv  id                    people to remove
+
+Changes are applied in that order. Merging a person moves their credits to
+`into_id` and then removes them; chains of merges (a into b, b into c) are
+followed to their end, and merging a person into themselves does nothing.
+
+`apply_delta` updates a loaded `degrees` module in place, touching only
+the people and movies named by the delta: in dict mode the dicts, in
+compact mode the graph's overlay (see graph.py). `patch_snapshot` appends
+the delta to the on-disk snapshot's log, which later loads replay on top
+of the memory-mapped arrays; with --compact it rewrites the snapshot with
+the log folded into its arrays instead.
+
+Usage: python delta.py [--compact] directory delta_directory
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+from snapshot import append_delta, load_snapshot, save_snapshot
+
+# Delta files and the columns read from each
+FILES = {
+    "people": ("id", "name", "birth"),
+    "movies": ("id", "title", "year"),
+    "stars": ("person_id", "movie_id"),
+    "merged_people": ("id", "into_id"),
+    "deleted_stars": ("person_id", "movie_id"),
+    "deleted_movies": ("id",),
+    "deleted_people": ("id",)
+}
+
+
+class Delta():
+    """
+    One batch of changes, as lists of row tuples keyed like `FILES`.
+    """
+
+    def __init__(self, **changes):
+        for kind in FILES:
+            setattr(self, kind, list(changes.get(kind, ())))
+
+    @classmethod
+    def read(cls, directory):
+        """
+        Reads the delta files present in `directory`.
+        """
+        changes = {}
+        for kind, columns in FILES.items():
+            path = os.path.join(directory, f"{kind}.csv")
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as f:
+                changes[kind] = [
+                    tuple(row[column] for column in columns)
+                    for row in csv.DictReader(f)
+                ]
+        return cls(**changes)
+
+    def adds_edges(self):
+        """
+        Returns True if the delta can shorten any path.
+        """
+        return bool(self.stars or self.merged_people)
+
+    def removed(self):
+        """
+        Returns the (people, movies) whose removal or lost credits can
+        lengthen or break a path.
+        """
+        people = {person for person, _ in self.merged_people}
+        people.update(person for person, in self.deleted_people)
+        people.update(person for person, _ in self.deleted_stars)
+        movies = {movie for movie, in self.deleted_movies}
+        movies.update(movie for _, movie in self.deleted_stars)
+        return people, movies
+
+
+def apply_delta(db, delta):
+    """
+    Applies `delta` to the data loaded in the `degrees` module `db`, and
+    drops the cached paths and landmark index that it invalidates.
+    """
+    if db.graph is not None:
+        patch_graph(db.graph, delta)
+    else:
+        patch_dicts(db.names, db.people, db.movies, delta)
+    if db.name_index is not None:
+        changed = changed_people(delta)
+        if changed:
+            db.name_index.refresh(changed, db.people)
+
+    # Adding credits can shorten any path, so nothing cached survives.
+    # Removals only invalidate paths through what was removed.
+    if delta.adds_edges():
+        db.path_cache.clear()
+    else:
+        people, movies = delta.removed()
+        db.path_cache.discard(people, movies)
+
+    if delta.adds_edges() or any(delta.removed()):
+        db.landmark_index = None
+
+
+def changed_people(delta):
+    """
+    Returns the ids of the people whose name or birth `delta` changes,
+    including those it adds, merges away or removes.
+    """
+    changed = [person_id for person_id, _, _ in delta.people]
+    changed.extend(merge_targets(delta.merged_people))
+    changed.extend(person_id for person_id, in delta.deleted_people)
+    return changed
+
+
+def patch_dicts(names, people, movies, delta):
+    """
+    Applies `delta` to the `names`, `people` and `movies` dicts of
+    `degrees.load_data`, in time proportional to the delta.
+    """
+    for person_id, name, birth in delta.people:
+        if person_id in people:
+            forget_name(names, people[person_id]["name"], person_id)
+            people[person_id].update(name=name, birth=birth)
+        else:
+            people[person_id] = {"name": name, "birth": birth,
+                                 "movies": set()}
+        names.setdefault(name.lower(), set()).add(person_id)
+
+    for movie_id, title, year in delta.movies:
+        if movie_id in movies:
+            movies[movie_id].update(title=title, year=year)
+        else:
+            movies[movie_id] = {"title": title, "year": year,
+                                "stars": set()}
+
+    for person_id, movie_id in delta.stars:
+        if person_id in people and movie_id in movies:
+            people[person_id]["movies"].add(movie_id)
+            movies[movie_id]["stars"].add(person_id)
+
+    for person_id, into_id in merge_targets(delta.merged_people).items():
+        if person_id not in people or into_id not in people:
+            continue
+        for movie_id in people[person_id]["movies"]:
+            movies[movie_id]["stars"].add(into_id)
+        people[into_id]["movies"].update(people[person_id]["movies"])
+        remove_person(names, people, movies, person_id)
+
+    for person_id, movie_id in delta.deleted_stars:
+        if person_id in people and movie_id in movies:
+            people[person_id]["movies"].discard(movie_id)
+            movies[movie_id]["stars"].discard(person_id)
+
+    for movie_id, in delta.deleted_movies:
+        if movie_id in movies:
+            for person_id in movies[movie_id]["stars"]:
+                people[person_id]["movies"].discard(movie_id)
+            del movies[movie_id]
+
+    for person_id, in delta.deleted_people:
+        if person_id in people:
+            remove_person(names, people, movies, person_id)
+
+
+def remove_person(names, people, movies, person_id):
+    for movie_id in people[person_id]["movies"]:
+        movies[movie_id]["stars"].discard(person_id)
+    forget_name(names, people[person_id]["name"], person_id)
+    del people[person_id]
+
+
+def forget_name(names, name, person_id):
+    ids = names.get(name.lower())
+    if ids is not None:
+        ids.discard(person_id)
+        if not ids:
+            del names[name.lower()]
+
+
+def merge_targets(merged_people):
+    """
+    Returns a dict mapping every person merged by `merged_people`, a list
+    of (id, into_id) rows, to the person their credits end up with once
+    chains of merges are followed. Merges of a person into themselves, and
+    cycles of merges, are ignored.
+    """
+    into = {person_id: into_id for person_id, into_id in merged_people
+            if person_id != into_id}
+    targets = {}
+    for person_id, target in into.items():
+        seen = {person_id}
+        while target in into and target not in seen:
+            seen.add(target)
+            target = into[target]
+        if target not in seen:
+            targets[person_id] = target
+    return targets
+
+
+def patch_graph(graph, delta):
+    """
+    Applies `delta` to the CompactGraph `graph` in place, in time
+    proportional to the delta, and returns the graph.
+    """
+    for person_id, name, birth in delta.people:
+        graph.set_person(person_id, name, birth)
+    for movie_id, title, year in delta.movies:
+        graph.set_movie(movie_id, title, year)
+
+    for person_id, movie_id in delta.stars:
+        try:
+            graph.add_credit(graph.person_index(person_id),
+                             graph.movie_index(movie_id))
+        except KeyError:
+            pass
+
+    for person_id, into_id in merge_targets(delta.merged_people).items():
+        try:
+            person = graph.person_index(person_id)
+            into = graph.person_index(into_id)
+        except KeyError:
+            continue
+        for movie in graph.movies_of(person).tolist():
+            graph.add_credit(into, movie)
+        graph.remove_person(person)
+
+    for person_id, movie_id in delta.deleted_stars:
+        try:
+            graph.remove_credit(graph.person_index(person_id),
+                                graph.movie_index(movie_id))
+        except KeyError:
+            pass
+
+    for movie_id, in delta.deleted_movies:
+        try:
+            graph.remove_movie(graph.movie_index(movie_id))
+        except KeyError:
+            pass
+    for person_id, in delta.deleted_people:
+        try:
+            graph.remove_person(graph.person_index(person_id))
+        except KeyError:
+            pass
+    return graph
+
+
+def patch_snapshot(directory, delta, compact=False):
+    """
+    Appends `delta` to the log of the snapshot of `directory`, keeping the
+    source CSV stats it was built from, so it stays in use until the CSVs
+    themselves change. With `compact`, the snapshot is rewritten with the
+    log and `delta` folded into its arrays instead.
+
+    Returns False if there is no current snapshot to patch.
+    """
+    if not compact:
+        return append_delta(directory, vars(delta))
+    graph = load_snapshot(directory)
+    if graph is None:
+        return False
+    patch_graph(graph, delta)
+    save_snapshot(directory, graph.compacted())
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python delta.py [--compact] directory delta_directory"
+    )
+    parser.add_argument("directory")
+    parser.add_argument("delta_directory")
+    parser.add_argument("--compact", action="store_true",
+                        help="rewrite the snapshot with every logged delta "
+                             "folded in, rather than appending to its log")
+    args = parser.parse_args()
+    delta = Delta.read(args.delta_directory)
+    if not patch_snapshot(args.directory, delta, args.compact):
+        sys.exit("No current snapshot to patch.")
+    print("Snapshot updated.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Single-source degrees of separation for many sources at once.
+
+`distances_from_many` runs a full BFS from each source person across a
+`multiprocessing` pool. The CSR arrays of the graph are copied once into
+shared memory and every worker maps them, rather than each receiving its
+own pickled copy of the graph.
+
+Usage: python distances.py directory person_id [person_id ...]
+"""
+
+import argparse
+import sys
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+from graph import CompactGraph
+
+# Arrays a worker needs to run a BFS, in the order of CompactGraph.arrays
+SHARED_ARRAYS = ("person_offsets", "person_movies",
+                 "movie_offsets", "movie_stars")
+
+# Graph attached to shared memory in each worker process
+worker_graph = None
+worker_blocks = []
+
+
+def distances_from(graph, source):
+    """
+    Returns (distances, parents, movies) for every person, from a BFS
+    starting at IMDB person id `source`. See `CompactGraph.single_source`.
+    """
+    return graph.single_source(graph.person_index(source))
+
+
+def distances_from_many(graph, sources, processes=None):
+    """
+    Returns a dict mapping each IMDB person id in `sources` to an int16
+    array of degrees of separation from it, indexed by person index
+    (-1 where unreachable). Sources are spread across `processes` workers
+    (one per CPU by default).
+    """
+    indices = [graph.person_index(source) for source in sources]
+    arrays = dict(zip(SHARED_ARRAYS, graph.arrays()))
+    blocks = []
+    try:
+        specs = {}
+        for name in SHARED_ARRAYS:
+            block, specs[name] = share(arrays[name])
+            blocks.append(block)
+        with Pool(processes, initializer=attach, initargs=(specs,)) as pool:
+            depths = pool.map(worker_distances, indices)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return dict(zip(sources, depths))
+
+
+def histogram(distances):
+    """
+    Returns counts of people at each degree of separation (index 0 being
+    the source itself) in one distance array, ignoring unreachable people.
+    """
+    return np.bincount(distances[distances >= 0])
+
+
+def aggregate_histogram(results):
+    """
+    Sums `histogram` over a dict of distance arrays.
+    """
+    total = np.zeros(0, dtype=np.int64)
+    for distances in results.values():
+        counts = histogram(distances)
+        if len(counts) > len(total):
+            total = np.pad(total, (0, len(counts) - len(total)))
+        total[:len(counts)] += counts
+    return total
+
+
+def share(array):
+    """
+    Copies `array` into a new shared memory block.
+
+    Returns the block and the (name, shape, dtype) needed to attach to it.
+    """
+    array = np.asarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+    view[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def attach(specs):
+    """
+    Pool initializer: maps the shared CSR arrays into a worker graph.
+    """
+    global worker_graph
+    arrays = {}
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        worker_blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    worker_graph = CompactGraph(
+        None, None,
+        arrays["person_offsets"], arrays["person_movies"],
+        arrays["movie_offsets"], arrays["movie_stars"],
+        None, None
+    )
+
+
+def worker_distances(source):
+    depth, _, _ = worker_graph.single_source(source)
+    return depth
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python distances.py directory person_id [person_id ...]"
+    )
+    parser.add_argument("directory")
+    parser.add_argument("sources", nargs="+", metavar="person_id")
+    parser.add_argument("-j", "--processes", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--save", metavar="FILE",
+                        help="save every distance array to FILE (.npz)")
+    args = parser.parse_args()
+
+    import degrees
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, compact=True)
+    graph = degrees.graph
+
+    try:
+        results = distances_from_many(graph, args.sources, args.processes)
+    except KeyError as e:
+        sys.exit(f"Person not found: {e.args[0]}")
+
+    for source, distances in results.items():
+        name = degrees.people[source]["name"]
+        counts = " ".join(str(count) for count in histogram(distances))
+        print(f"{source} ({name}): {counts}")
+    counts = " ".join(str(count) for count in aggregate_histogram(results))
+    print(f"All sources: {counts}")
+
+    if args.save:
+        np.savez_compressed(args.save, person_ids=graph.person_id_array(),
+                            **{f"from_{s}": d for s, d in results.items()})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,908 @@
+"""
+Compact, integer-indexed representation of the degrees dataset.
+
+People and movies are interned to dense integers (their position in an
+array of IMDB ids sorted ascending) and the bipartite person-movie graph
+is stored as two CSR adjacency structures: `person_offsets`/`person_movies`
+list the movies of each person, `movie_offsets`/`movie_stars` the stars of
+each movie. Names, titles and other strings live in `StringTable`s, which
+keep every string in one UTF-8 byte array instead of a Python object each.
+
+The arrays are never modified. Changes made afterwards (see delta.py) go
+to an `Overlay` instead, in time proportional to the change: a changed
+row of either CSR is replaced as a whole, and new people and movies are
+appended after the last index. `compacted` folds the overlay back into
+fresh arrays.
+"""
+
+import bisect
+from collections.abc import Mapping
+
+import numpy as np
+
+from ingest import read_dataset
+
+
+class StringTable():
+    """
+    Immutable sequence of strings packed into a single byte array.
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(s) for s in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(offsets, data)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return bytes(self.data[start:end]).decode("utf-8")
+
+    def __iter__(self):
+        data = bytes(self.data)
+        offsets = self.offsets.tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield data[start:end].decode("utf-8")
+
+
+class CompactGraph():
+    """
+    CSR graph of people and movies, searched with vectorized BFS layers.
+    """
+
+    def __init__(self, people, movies, person_offsets, person_movies,
+                 movie_offsets, movie_stars, name_keys, name_people):
+        """
+        `people` and `movies` are dicts of parallel arrays describing each
+        vertex: people have "id", "name" and "birth", movies have "id",
+        "title" and "year". "id" is a sorted int64 array, the rest are
+        `StringTable`s. `name_keys` holds every lowercased name in sorted
+        order and `name_people` the person index for each key.
+        """
+        self.people = people
+        self.movies = movies
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+        self.name_keys = name_keys
+        self.name_people = name_people
+
+        # Changes made since the arrays were built, if any
+        self.overlay = None
+
+    @property
+    def num_people(self):
+        """Number of person indices, including removed people."""
+        count = len(self.person_offsets) - 1
+        if self.overlay is not None:
+            count += len(self.overlay.person_ids)
+        return count
+
+    @property
+    def num_movies(self):
+        """Number of movie indices, including removed movies."""
+        count = len(self.movie_offsets) - 1
+        if self.overlay is not None:
+            count += len(self.overlay.movie_ids)
+        return count
+
+    @property
+    def live_people(self):
+        """Number of people not removed."""
+        if self.overlay is None:
+            return self.num_people
+        return self.num_people - len(self.overlay.removed_people)
+
+    @property
+    def live_movies(self):
+        """Number of movies not removed."""
+        if self.overlay is None:
+            return self.num_movies
+        return self.num_movies - len(self.overlay.removed_movies)
+
+    def person_index(self, person_id):
+        """
+        Returns the dense index of an IMDB person id, raising KeyError
+        if the person is unknown.
+        """
+        if self.overlay is None:
+            return _lookup(self.people["id"], person_id)
+        return _lookup(self.people["id"], person_id,
+                       self.overlay.person_indices,
+                       self.overlay.removed_people)
+
+    def movie_index(self, movie_id):
+        """
+        Returns the dense index of an IMDB movie id, raising KeyError
+        if the movie is unknown.
+        """
+        if self.overlay is None:
+            return _lookup(self.movies["id"], movie_id)
+        return _lookup(self.movies["id"], movie_id,
+                       self.overlay.movie_indices,
+                       self.overlay.removed_movies)
+
+    def person_id(self, index):
+        base = len(self.person_offsets) - 1
+        if index < base:
+            return str(self.people["id"][index])
+        return str(self.overlay.person_ids[index - base])
+
+    def movie_id(self, index):
+        base = len(self.movie_offsets) - 1
+        if index < base:
+            return str(self.movies["id"][index])
+        return str(self.overlay.movie_ids[index - base])
+
+    def person_id_array(self):
+        """
+        Returns the IMDB id of every person index, as an int64 array.
+        """
+        if self.overlay is None:
+            return np.asarray(self.people["id"])
+        return np.concatenate([
+            self.people["id"],
+            np.array(self.overlay.person_ids, dtype=np.int64)
+        ])
+
+    def movie_id_array(self):
+        """
+        Returns the IMDB id of every movie index, as an int64 array.
+        """
+        if self.overlay is None:
+            return np.asarray(self.movies["id"])
+        return np.concatenate([
+            self.movies["id"],
+            np.array(self.overlay.movie_ids, dtype=np.int64)
+        ])
+
+    def person(self, index):
+        """
+        Returns the (name, birth) of a person.
+        """
+        if self.overlay is not None and index in self.overlay.people:
+            return self.overlay.people[index]
+        return self.people["name"][index], self.people["birth"][index]
+
+    def movie(self, index):
+        """
+        Returns the (title, year) of a movie.
+        """
+        if self.overlay is not None and index in self.overlay.movies:
+            return self.overlay.movies[index]
+        return self.movies["title"][index], self.movies["year"][index]
+
+    def person_records(self):
+        """
+        Yields the (person_id, name, birth) of every person not removed,
+        in index order.
+        """
+        if self.overlay is None:
+            yield from zip(
+                (str(i) for i in self.people["id"].tolist()),
+                self.people["name"], self.people["birth"]
+            )
+            return
+        ids = self.person_id_array()
+        names, births = _patched_columns(
+            len(ids), (self.people["name"], self.people["birth"]),
+            self.overlay.people
+        )
+        removed = self.overlay.removed_people
+        for index, person_id in enumerate(ids.tolist()):
+            if index not in removed:
+                yield str(person_id), names[index], births[index]
+
+    def movies_of(self, index):
+        """
+        Returns a view of the movie indices a person starred in.
+        """
+        if self.overlay is not None and index in self.overlay.person_rows:
+            return self.overlay.person_rows[index]
+        offsets = self.person_offsets
+        return self.person_movies[offsets[index]:offsets[index + 1]]
+
+    def stars_of(self, index):
+        """
+        Returns a view of the person indices who starred in a movie.
+        """
+        if self.overlay is not None and index in self.overlay.movie_rows:
+            return self.overlay.movie_rows[index]
+        offsets = self.movie_offsets
+        return self.movie_stars[offsets[index]:offsets[index + 1]]
+
+    def expand_people(self, rows):
+        """
+        Gathers the movies of the people at indices `rows`, as
+        `expand_rows` does.
+        """
+        if self.overlay is None:
+            return expand_rows(self.person_offsets, self.person_movies, rows)
+        return _expand(self.person_offsets, self.person_movies, rows,
+                       self.overlay, self.overlay.person_rows)
+
+    def expand_movies(self, rows):
+        """
+        Gathers the stars of the movies at indices `rows`, as
+        `expand_rows` does.
+        """
+        if self.overlay is None:
+            return expand_rows(self.movie_offsets, self.movie_stars, rows)
+        return _expand(self.movie_offsets, self.movie_stars, rows,
+                       self.overlay, self.overlay.movie_rows)
+
+    def people_named(self, name):
+        """
+        Returns the indices of every person whose lowercased name is `name`.
+        """
+        start = bisect.bisect_left(self.name_keys, name)
+        end = bisect.bisect_right(self.name_keys, name, lo=start)
+        people = self.name_people[start:end]
+        overlay = self.overlay
+        if overlay is None:
+            return people
+
+        # People renamed, added or removed since are named by the overlay
+        people = [person for person in people.tolist()
+                  if person not in overlay.people
+                  and person not in overlay.removed_people]
+        people.extend(overlay.names.get(name, ()))
+        return np.array(sorted(people), dtype=np.int32)
+
+    def distinct_names(self):
+        """
+        Yields every lowercased name some person has, in sorted order.
+        """
+        if self.overlay is None:
+            previous = None
+            for key in self.name_keys:
+                if key != previous:
+                    yield key
+                previous = key
+            return
+        keys = set(self.name_keys) | set(self.overlay.names)
+        for key in sorted(keys):
+            if len(self.people_named(key)):
+                yield key
+
+    def set_person(self, person_id, name, birth):
+        """
+        Adds a person, or updates the name and birth of an existing
+        (or removed) one. Returns their index.
+        """
+        overlay = self.edit()
+        try:
+            index = self.person_index(person_id)
+        except KeyError:
+            index = _find(self.people["id"], overlay.person_indices,
+                          person_id)
+            if index is None:
+                index = self.num_people
+                overlay.person_ids.append(int(person_id))
+                overlay.person_indices[int(person_id)] = index
+                overlay.set_row(overlay.person_rows, index, [])
+            overlay.removed_people.discard(index)
+        overlay.forget_name(index)
+        overlay.people[index] = (name, birth)
+        overlay.names.setdefault(name.lower(), set()).add(index)
+        return index
+
+    def set_movie(self, movie_id, title, year):
+        """
+        Adds a movie, or updates the title and year of an existing (or
+        removed) one. Returns its index.
+        """
+        overlay = self.edit()
+        try:
+            index = self.movie_index(movie_id)
+        except KeyError:
+            index = _find(self.movies["id"], overlay.movie_indices,
+                          movie_id)
+            if index is None:
+                index = self.num_movies
+                overlay.movie_ids.append(int(movie_id))
+                overlay.movie_indices[int(movie_id)] = index
+                overlay.set_row(overlay.movie_rows, index, [])
+            overlay.removed_movies.discard(index)
+        overlay.movies[index] = (title, year)
+        return index
+
+    def add_credit(self, person, movie):
+        """Records that the person at index `person` starred in `movie`."""
+        overlay = self.edit()
+        movies = self.movies_of(person)
+        if movie in movies:
+            return
+        overlay.set_row(overlay.person_rows, person,
+                        np.append(movies, movie))
+        overlay.set_row(overlay.movie_rows, movie,
+                        np.append(self.stars_of(movie), person))
+
+    def remove_credit(self, person, movie):
+        """Removes a credit added by `add_credit` (or built in)."""
+        overlay = self.edit()
+        movies = self.movies_of(person)
+        if movie not in movies:
+            return
+        overlay.set_row(overlay.person_rows, person, movies[movies != movie])
+        stars = self.stars_of(movie)
+        overlay.set_row(overlay.movie_rows, movie, stars[stars != person])
+
+    def remove_person(self, index):
+        """Removes a person and their credits."""
+        for movie in self.movies_of(index).tolist():
+            self.remove_credit(index, movie)
+        overlay = self.edit()
+        overlay.forget_name(index)
+        overlay.removed_people.add(index)
+
+    def remove_movie(self, index):
+        """Removes a movie and its credits."""
+        for person in self.stars_of(index).tolist():
+            self.remove_credit(person, index)
+        self.edit().removed_movies.add(index)
+
+    def edit(self):
+        """Returns the overlay, starting one if there is none yet."""
+        if self.overlay is None:
+            self.overlay = Overlay()
+        return self.overlay
+
+    def arrays(self):
+        """
+        Returns (person_offsets, person_movies, movie_offsets, movie_stars)
+        with the overlay folded in, over the same indices.
+        """
+        if self.overlay is None:
+            return (self.person_offsets, self.person_movies,
+                    self.movie_offsets, self.movie_stars)
+        return (
+            *_fold(self.person_offsets, self.person_movies,
+                   self.overlay.person_rows, self.num_people),
+            *_fold(self.movie_offsets, self.movie_stars,
+                   self.overlay.movie_rows, self.num_movies)
+        )
+
+    def compacted(self):
+        """
+        Returns a new CompactGraph without an overlay holding the same
+        people, movies and credits. Indices are reassigned.
+        """
+        if self.overlay is None:
+            return self
+        person_offsets, person_movies, _, _ = self.arrays()
+        owners = np.repeat(np.arange(self.num_people),
+                           np.diff(person_offsets))
+        overlay = self.overlay
+        people = _live_columns(self.person_id_array(),
+                               (self.people["name"], self.people["birth"]),
+                               overlay.people, overlay.removed_people)
+        movies = _live_columns(self.movie_id_array(),
+                               (self.movies["title"], self.movies["year"]),
+                               overlay.movies, overlay.removed_movies)
+        return build_graph(
+            dict(zip(("id", "name", "birth"), people)),
+            dict(zip(("id", "title", "year"), movies)),
+            self.person_id_array()[owners],
+            self.movie_id_array()[person_movies]
+        )
+
+    def neighbors_for_person(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        neighbors = set()
+        for movie in self.movies_of(self.person_index(person_id)):
+            movie_id = self.movie_id(movie)
+            for star in self.stars_of(movie):
+                neighbors.add((movie_id, self.person_id(star)))
+        return neighbors
+
+    def shortest_path(self, source, target, landmarks=None, stats=None):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target.
+
+        If no possible path, returns None.
+
+        With a `LandmarkIndex`, people that cannot lie on a path within the
+        landmark upper bound are pruned from the search. If `stats` is a
+        dict, it is filled with the number of people reached and pruned,
+        and the landmark bounds.
+        """
+        if source == target:
+            return None
+        start, goal = self.person_index(source), self.person_index(target)
+        forward = _Search(self, start)
+        backward = _Search(self, goal)
+
+        if landmarks is not None:
+            lower, upper = landmarks.bounds(start, goal)
+            if stats is not None:
+                stats.update(lower=lower, upper=upper)
+            if lower is None:
+                return None
+            if upper is not None:
+                forward.prune = landmarks.pruner(goal, upper)
+                backward.prune = landmarks.pruner(start, upper)
+
+        try:
+            return self._search(forward, backward)
+        finally:
+            if stats is not None:
+                stats["reached"] = int(
+                    np.count_nonzero(forward.depth >= 0)
+                    + np.count_nonzero(backward.depth >= 0)
+                )
+                stats["pruned"] = forward.pruned + backward.pruned
+
+    def _search(self, forward, backward):
+        """
+        Runs a bidirectional search until its two sides meet.
+        """
+        while forward.frontier.size and backward.frontier.size:
+            if forward.frontier.size <= backward.frontier.size:
+                meeting = forward.grow(backward)
+            else:
+                meeting = backward.grow(forward)
+            if meeting is not None:
+                return self._join(meeting, forward, backward)
+        return None
+
+    def single_source(self, source):
+        """
+        Runs a full BFS from the person at index `source`.
+
+        Returns (depth, parent, movie) arrays over every person index:
+        degrees of separation from the source (-1 if unreachable), and the
+        person and movie indices each person was first reached through
+        (-1 for the source and unreachable people).
+        """
+        search = _Search(self, source)
+        while search.frontier.size:
+            search.grow()
+        return search.depth, search.parent, search.movie
+
+    def _join(self, meeting, forward, backward):
+        """
+        Builds the (movie_id, person_id) path through `meeting`.
+        """
+        path = []
+        person = meeting
+        while forward.parent[person] >= 0:
+            path.append((forward.movie[person], person))
+            person = forward.parent[person]
+        path.reverse()
+
+        person = meeting
+        while backward.parent[person] >= 0:
+            path.append((backward.movie[person], backward.parent[person]))
+            person = backward.parent[person]
+
+        return [(self.movie_id(movie), self.person_id(person))
+                for movie, person in path]
+
+
+class _Search():
+    """
+    One side of a bidirectional, layer-at-a-time BFS over a CompactGraph.
+    """
+
+    def __init__(self, graph, start):
+        self.graph = graph
+        self.parent = np.full(graph.num_people, -1, dtype=np.int32)
+        self.movie = np.full(graph.num_people, -1, dtype=np.int32)
+        self.depth = np.full(graph.num_people, -1, dtype=np.int16)
+        self.seen_movies = np.zeros(graph.num_movies, dtype=bool)
+        self.depth[start] = 0
+        self.layer = 0
+        self.frontier = np.array([start], dtype=np.int32)
+
+        # Optional filter over newly reached people: called with their
+        # indices and depth, returns a mask of the ones worth expanding
+        self.prune = None
+        self.pruned = 0
+        self.skip = None
+
+    def grow(self, other=None):
+        """
+        Expands the frontier by one layer.
+
+        Returns a person reached by both this side and `other`,
+        or None if the two sides have not met yet (or there is no `other`).
+        """
+        graph = self.graph
+
+        # Movies of the frontier not already expanded from this side
+        owners, movies = graph.expand_people(self.frontier)
+        owners = self.frontier[owners]
+        fresh = ~self.seen_movies[movies]
+        owners, movies = owners[fresh], movies[fresh]
+        movies, first = np.unique(movies, return_index=True)
+        owners = owners[first]
+        self.seen_movies[movies] = True
+
+        # Stars of those movies not already reached from this side
+        via, stars = graph.expand_movies(movies)
+        fresh = self.depth[stars] < 0
+        if self.skip is not None:
+            fresh &= ~self.skip[stars]
+        via, stars = via[fresh], stars[fresh]
+        stars, first = np.unique(stars, return_index=True)
+        via = via[first]
+        self.layer += 1
+
+        # Pruned people are remembered so they are only tested once
+        if self.prune is not None:
+            keep = self.prune(stars, self.layer)
+            if not keep.all():
+                if self.skip is None:
+                    self.skip = np.zeros(graph.num_people, dtype=bool)
+                self.skip[stars[~keep]] = True
+                self.pruned += int(np.count_nonzero(~keep))
+                via, stars = via[keep], stars[keep]
+
+        self.depth[stars] = self.layer
+        self.parent[stars] = owners[via]
+        self.movie[stars] = movies[via]
+        self.frontier = stars
+
+        if other is None:
+            return None
+        met = stars[other.depth[stars] >= 0]
+        if not met.size:
+            return None
+
+        # Without pruning every meeting closes a path of the same length,
+        # with it only the one closest to the other end is guaranteed to
+        return int(met[np.argmin(other.depth[met])])
+
+
+def expand_rows(offsets, indices, rows):
+    """
+    Gathers the CSR rows `rows` in one pass.
+
+    Returns (position, value) arrays where `value[k]` was read from row
+    `rows[position[k]]`.
+    """
+    starts = offsets[rows]
+    counts = offsets[rows + 1] - starts
+    total = int(counts.sum())
+    position = np.repeat(np.arange(len(rows)), counts)
+    shift = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return position, indices[np.arange(total) + shift]
+
+
+class Overlay():
+    """
+    Changes to a CompactGraph since its arrays were built.
+    """
+
+    def __init__(self):
+        # Replacement CSR rows, by person or movie index
+        self.person_rows = {}
+        self.movie_rows = {}
+
+        # Sorted indices of the replaced person (True) and movie (False)
+        # rows, rebuilt when needed
+        self.replaced = {}
+
+        # IMDB ids of the people and movies appended after the arrays,
+        # and the index of each
+        self.person_ids = []
+        self.movie_ids = []
+        self.person_indices = {}
+        self.movie_indices = {}
+
+        # (name, birth) and (title, year) of added or updated vertices,
+        # and the people in `people` by lowercased name
+        self.people = {}
+        self.movies = {}
+        self.names = {}
+
+        self.removed_people = set()
+        self.removed_movies = set()
+
+    def set_row(self, rows, index, values):
+        """Replaces row `index` of `person_rows` or `movie_rows`."""
+        rows[index] = np.array(sorted(values), dtype=np.int32)
+        self.replaced.pop(rows is self.person_rows, None)
+
+    def replaced_rows(self, rows):
+        """
+        Returns the indices replaced in `person_rows` or `movie_rows`, as
+        a sorted array.
+        """
+        key = rows is self.person_rows
+        if key not in self.replaced:
+            self.replaced[key] = np.array(sorted(rows), dtype=np.int64)
+        return self.replaced[key]
+
+    def forget_name(self, index):
+        """Drops a person's overlay name, if any."""
+        if index not in self.people:
+            return
+        key = self.people.pop(index)[0].lower()
+        self.names[key].discard(index)
+        if not self.names[key]:
+            del self.names[key]
+
+
+class PeopleView(Mapping):
+    """
+    Read-only `people` dict look-alike backed by a CompactGraph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        index = graph.person_index(person_id)
+        name, birth = graph.person(index)
+        return {
+            "name": name,
+            "birth": birth,
+            "movies": {graph.movie_id(m) for m in graph.movies_of(index)}
+        }
+
+    def __iter__(self):
+        return (person_id for person_id, _, _ in self.graph.person_records())
+
+    def __len__(self):
+        return self.graph.live_people
+
+
+class MoviesView(Mapping):
+    """
+    Read-only `movies` dict look-alike backed by a CompactGraph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        index = graph.movie_index(movie_id)
+        title, year = graph.movie(index)
+        return {
+            "title": title,
+            "year": year,
+            "stars": {graph.person_id(p) for p in graph.stars_of(index)}
+        }
+
+    def __iter__(self):
+        graph = self.graph
+        removed = graph.overlay.removed_movies if graph.overlay else ()
+        return (graph.movie_id(index) for index in range(graph.num_movies)
+                if index not in removed)
+
+    def __len__(self):
+        return self.graph.live_movies
+
+
+class NamesView(Mapping):
+    """
+    Read-only `names` dict look-alike backed by a CompactGraph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        people = self.graph.people_named(name)
+        if len(people) == 0:
+            raise KeyError(name)
+        return {self.graph.person_id(person) for person in people}
+
+    def __iter__(self):
+        return self.graph.distinct_names()
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def load_compact(directory, stats=None):
+    """
+    Load data from CSV files into a CompactGraph.
+
+    Person and movie ids must be integers, as they are in the IMDB dumps.
+    If `stats` is a dict, it is filled with the (rows, seconds) taken to
+    parse each file.
+    """
+    people, movies, stars, timings = read_dataset(directory)
+    if stats is not None:
+        stats.update(timings)
+    person_ids, names, births = _sorted_columns(*people)
+    movie_ids, titles, years = _sorted_columns(*movies)
+    return build_graph(
+        {"id": person_ids, "name": names, "birth": births},
+        {"id": movie_ids, "title": titles, "year": years},
+        *stars
+    )
+
+
+def build_graph(people, movies, star_people, star_movies):
+    """
+    Builds a CompactGraph from vertex columns and raw star edges.
+
+    `people` and `movies` map column names to lists, with "id" holding
+    integer ids sorted ascending. Star edges are given as parallel arrays
+    of IMDB ids; edges naming an unknown person or movie are dropped.
+    """
+    person_ids = np.asarray(people["id"], dtype=np.int64)
+    movie_ids = np.asarray(movies["id"], dtype=np.int64)
+
+    # Intern edge endpoints, dropping dangling and duplicate edges
+    persons = np.searchsorted(person_ids, star_people)
+    films = np.searchsorted(movie_ids, star_movies)
+    known = (
+        (persons < len(person_ids)) & (films < len(movie_ids))
+    )
+    known[known] = (
+        (person_ids[persons[known]] == star_people[known])
+        & (movie_ids[films[known]] == star_movies[known])
+    )
+    edges = np.unique(
+        persons[known] * len(movie_ids) + films[known]
+    )
+    persons = (edges // max(len(movie_ids), 1)).astype(np.int32)
+    films = (edges % max(len(movie_ids), 1)).astype(np.int32)
+
+    person_offsets, person_movies = _csr(persons, films, len(person_ids))
+    movie_offsets, movie_stars = _csr(films, persons, len(movie_ids))
+
+    keys = [name.lower() for name in people["name"]]
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+
+    return CompactGraph(
+        {
+            "id": person_ids,
+            "name": StringTable.from_strings(people["name"]),
+            "birth": StringTable.from_strings(people["birth"])
+        },
+        {
+            "id": movie_ids,
+            "title": StringTable.from_strings(movies["title"]),
+            "year": StringTable.from_strings(movies["year"])
+        },
+        person_offsets, person_movies, movie_offsets, movie_stars,
+        StringTable.from_strings([keys[i] for i in order]),
+        np.array(order, dtype=np.int32)
+    )
+
+
+def _sorted_columns(ids, *columns):
+    """
+    Sorts an id array and the matching column lists by id.
+    """
+    order = np.argsort(ids, kind="stable")
+    return (ids[order],) + tuple(
+        [column[i] for i in order.tolist()] for column in columns
+    )
+
+
+def _live_columns(ids, tables, changed, removed):
+    """
+    Returns the sorted (ids, column, column) of the vertices not in
+    `removed`, given the id of every index, the two `StringTable` columns
+    of the arrays, and the overlay's dict of changed column values.
+    """
+    columns = _patched_columns(len(ids), tables, changed)
+    live = np.ones(len(ids), dtype=bool)
+    live[list(removed)] = False
+    indices = np.flatnonzero(live).tolist()
+    return _sorted_columns(ids[live], *[
+        [column[i] for i in indices] for column in columns
+    ])
+
+
+def _patched_columns(count, tables, changed):
+    """
+    Returns the two `StringTable` columns of the arrays as lists of
+    `count` values, with the overlay's dict of changed values applied.
+    """
+    columns = [list(table) for table in tables]
+    for column in columns:
+        column.extend([None] * (count - len(column)))
+    for index, values in changed.items():
+        for column, value in zip(columns, values):
+            column[index] = value
+    return columns
+
+
+def _csr(rows, columns, num_rows):
+    """
+    Returns (offsets, indices) of the CSR matrix with the given entries.
+    """
+    order = np.lexsort((columns, rows))
+    offsets = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_rows), out=offsets[1:])
+    return offsets, columns[order].astype(np.int32)
+
+
+def _lookup(ids, key, added=None, removed=()):
+    """
+    Returns the position of integer id `key` in the sorted array `ids`,
+    or its index in `added`, unless that index is in `removed`.
+    """
+    index = _find(ids, added, key)
+    if index is None or index in removed:
+        raise KeyError(key)
+    return index
+
+
+def _find(ids, added, key):
+    """
+    Returns the index of id `key` in `ids` or `added`, or None.
+    """
+    try:
+        value = int(key)
+    except (TypeError, ValueError):
+        return None
+    if added and value in added:
+        return added[value]
+    index = int(np.searchsorted(ids, value))
+    if index == len(ids) or ids[index] != value:
+        return None
+    return index
+
+
+def _expand(offsets, indices, rows, overlay, replaced):
+    """
+    `expand_rows` for a CSR with the rows in `replaced`, one of the
+    overlay's row dicts, replaced or appended.
+    """
+    if not replaced:
+        return expand_rows(offsets, indices, rows)
+    patched = np.isin(rows, overlay.replaced_rows(replaced))
+    plain = np.flatnonzero(~patched)
+    position, values = expand_rows(offsets, indices, rows[plain])
+    position = plain[position]
+    changed = np.flatnonzero(patched)
+    if changed.size:
+        parts = [replaced[row] for row in rows[changed].tolist()]
+        position = np.concatenate([
+            position, np.repeat(changed, [len(part) for part in parts])
+        ])
+        values = np.concatenate([values] + parts)
+    return position, values
+
+
+def _fold(offsets, indices, replaced, count):
+    """
+    Returns (offsets, indices) of a CSR of `count` rows with the rows in
+    dict `replaced` replaced.
+    """
+    base = len(offsets) - 1
+    lengths = np.zeros(count, dtype=np.int64)
+    lengths[:base] = np.diff(offsets)
+    for row, values in replaced.items():
+        lengths[row] = len(values)
+    folded = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(lengths, out=folded[1:])
+    result = np.empty(folded[-1], dtype=np.int32)
+
+    # Copy the unchanged rows in one pass, then the replaced ones
+    keep = np.ones(base, dtype=bool)
+    keep[[row for row in replaced if row < base]] = False
+    rows = np.flatnonzero(keep)
+    position, values = expand_rows(offsets, indices, rows)
+    within = np.arange(len(position)) - np.repeat(
+        np.cumsum(lengths[rows]) - lengths[rows], lengths[rows]
+    )
+    result[folded[rows][position] + within] = values
+    for row, values in replaced.items():
+        result[folded[row]:folded[row + 1]] = values
+    return folded, result
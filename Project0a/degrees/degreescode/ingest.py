@@ -0,0 +1,221 @@
+"""
+Streaming CSV ingestion for the degrees dataset.
+
+`read_dataset` parses the three CSVs in large buffered blocks, converting
+ids to integers as it goes, and parses `stars.csv` (by far the largest
+file) in a worker process while the people and movies are parsed here.
+It also times every file so load throughput can be logged.
+"""
+
+import csv
+import gc
+import io
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Bytes read per block
+BLOCK_SIZE = 1 << 24
+
+# Key in read_dataset's stats of the peak RSS of the stars.csv worker
+WORKER_RSS = "stars.csv worker"
+
+
+def read_dataset(directory, overlap=True):
+    """
+    Reads people.csv, movies.csv and stars.csv from `directory`.
+
+    Returns (people, movies, stars, stats): `people` and `movies` are
+    (ids, column, column) with ids as an int64 array, `stars` is a pair of
+    int64 arrays (person ids, movie ids), and `stats` maps each file name
+    to its (rows, seconds). With `overlap`, stars.csv is parsed in a worker
+    process at the same time as the other two files, and `stats` also maps
+    WORKER_RSS to the worker's peak RSS in bytes.
+    """
+    stats = {}
+    executor = ProcessPoolExecutor(max_workers=1) if overlap else None
+    try:
+        if executor is not None:
+            stars = executor.submit(read_stars_in_worker,
+                                    f"{directory}/stars.csv")
+        people = timed(read_vertices, f"{directory}/people.csv")
+        movies = timed(read_vertices, f"{directory}/movies.csv")
+        if executor is not None:
+            stars, stats[WORKER_RSS] = stars.result()
+        else:
+            stars = timed(read_stars, f"{directory}/stars.csv")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    for name, (result, seconds) in (("people.csv", people),
+                                    ("movies.csv", movies),
+                                    ("stars.csv", stars)):
+        stats[name] = (len(result[0]), seconds)
+    return people[0], movies[0], stars[0], stats
+
+
+def timed(function, *args):
+    """
+    Returns (function(*args), seconds taken).
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def read_stars_in_worker(path):
+    """
+    Returns (timed(read_stars, path), peak RSS of this worker process).
+    """
+    return timed(read_stars, path), peak_rss()
+
+
+def read_vertices(path):
+    """
+    Reads an `id,text,text` CSV (people.csv or movies.csv).
+
+    Returns (ids, column, column): an int64 array of ids and two lists of
+    strings. Blocks are cut after whole records, so a quoted field holding
+    a newline is never split.
+    """
+    blocks = []
+
+    # The millions of row lists parsed here cannot form cycles, but would
+    # set off the cyclic garbage collector over and over
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        with open(path, encoding="utf-8", newline="",
+                  buffering=BLOCK_SIZE) as f:
+            f.readline()
+            tail = ""
+            while True:
+                block = f.read(BLOCK_SIZE)
+                if not block:
+                    break
+                block = tail + block
+                end = record_end(block)
+                tail = block[end:]
+                blocks.append(parse_vertices(block[:end]))
+            if tail.strip():
+                blocks.append(parse_vertices(tail))
+    finally:
+        if collecting:
+            gc.enable()
+    ids = [block[0] for block in blocks]
+    first = []
+    second = []
+    for _, column, other in blocks:
+        first.extend(column)
+        second.extend(other)
+    ids = np.concatenate(ids) if ids else np.zeros(0, np.int64)
+    return ids, first, second
+
+
+def record_end(block):
+    """
+    Returns the index just past the last newline of `block` that ends a
+    record (one outside any quoted field), or 0 if there is none.
+    """
+    end = block.rfind("\n") + 1
+    while end and block.count('"', 0, end) % 2:
+        end = block.rfind("\n", 0, end - 1) + 1
+    return end
+
+
+def parse_vertices(block):
+    """
+    Returns (ids, column, column) for a block of `id,text,text` CSV lines,
+    parsed by the csv module in one pass and split into columns by zip.
+    Blank lines are skipped.
+    """
+    rows = list(filter(None, csv.reader(io.StringIO(block))))
+    if not rows:
+        return np.zeros(0, np.int64), [], []
+    ids, first, second = list(zip(*rows))[:3]
+    values = np.fromstring(",".join(ids), dtype=np.int64, sep=",")
+    if len(values) != len(ids):
+        # Not plain integers: let int() accept or reject each one
+        values = np.array([int(value) for value in ids], dtype=np.int64)
+    return values, list(first), list(second)
+
+
+def read_stars(path):
+    """
+    Reads stars.csv as a pair of int64 arrays (person ids, movie ids).
+
+    Blocks of plain `int,int` lines are parsed by NumPy in one call each;
+    any block with quoting falls back to the csv module.
+    """
+    blocks = []
+    with open(path, "rb", buffering=0) as f:
+        f.readline()
+        tail = b""
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                break
+            block = tail + block
+            end = block.rfind(b"\n") + 1
+            tail = block[end:]
+            blocks.append(parse_pairs(block[:end]))
+        if tail.strip():
+            blocks.append(parse_pairs(tail))
+    pairs = np.concatenate(blocks) if blocks else np.zeros(0, np.int64)
+    pairs = pairs.reshape(-1, 2)
+    return pairs[:, 0].copy(), pairs[:, 1].copy()
+
+
+def parse_pairs(block):
+    """
+    Returns the integers of a block of `int,int` CSV lines, flattened.
+    Blank lines are skipped.
+    """
+    if b'"' not in block:
+        # Splitting on whitespace also drops blank lines and carriage
+        # returns; anything else NumPy cannot read goes to the csv module
+        lines = block.split()
+        try:
+            values = np.fromstring(b",".join(lines).decode("ascii"),
+                                   dtype=np.int64, sep=",")
+        except ValueError:
+            pass
+        else:
+            if len(values) == 2 * len(lines):
+                return values
+    reader = csv.reader(io.StringIO(block.decode("utf-8")))
+    values = [int(value) for row in reader if row for value in row[:2]]
+    return np.array(values, dtype=np.int64)
+
+
+def peak_rss():
+    """
+    Returns the peak resident set size of this process, in bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def format_stats(stats):
+    """
+    Returns log lines describing the throughput recorded in `stats`.
+    """
+    lines = []
+    for name, value in stats.items():
+        if name == WORKER_RSS:
+            continue
+        rows, seconds = value
+        rate = rows / seconds if seconds else float("inf")
+        lines.append(f"{name}: {rows} rows in {seconds:.2f}s "
+                     f"({rate:,.0f} rows/s)")
+    lines.append(f"Peak RSS: {peak_rss() / (1 << 20):,.0f} MiB")
+    if WORKER_RSS in stats:
+        lines.append(f"Peak RSS of the stars.csv worker: "
+                     f"{stats[WORKER_RSS] / (1 << 20):,.0f} MiB")
+    return lines
@@ -0,0 +1,175 @@
+"""
+Landmark index over a CompactGraph for bounded degree-of-separation queries.
+
+The index stores the BFS distances from k high-degree "landmark" actors to
+every person. Because distances obey the triangle inequality, for any
+landmark L
+
+    |d(L, s) - d(L, t)|  <=  d(s, t)  <=  d(L, s) + d(L, t)
+
+so the best of these over all landmarks bounds d(s, t) instantly, and an
+exact search can drop anyone whose distance so far plus their lower bound
+to the target already exceeds the upper bound.
+
+Usage: python landmarks.py directory index.npz [-k K]
+"""
+
+import argparse
+import hashlib
+import sys
+
+import numpy as np
+
+from distances import distances_from_many
+
+# Lower bound used for people no path can connect to the target
+UNREACHABLE = np.iinfo(np.int32).max // 2
+
+
+class LandmarkIndex():
+    """
+    BFS distances from a set of landmark people to every person.
+    """
+
+    def __init__(self, landmarks, distances, fingerprint):
+        """
+        `landmarks` holds the person indices of the landmarks and
+        `distances` the matching rows of distances (-1 if unreachable).
+        `fingerprint` identifies the graph the index was built for.
+        """
+        self.landmarks = landmarks
+        self.distances = distances
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, graph, k=16, processes=None):
+        """
+        Builds an index over the `k` people with the most co-stars.
+        """
+        landmarks = np.sort(np.argsort(-costar_counts(graph))[:k])
+        sources = [graph.person_id(landmark) for landmark in landmarks]
+        results = distances_from_many(graph, sources, processes)
+        distances = np.stack([results[source] for source in sources])
+        return cls(landmarks, distances, graph_fingerprint(graph))
+
+    @classmethod
+    def load(cls, path, graph):
+        """
+        Loads an index saved with `save`, returning None if it was built
+        for a graph with different people or edges than `graph`.
+        """
+        fingerprint = graph_fingerprint(graph)
+        with np.load(path) as data:
+            if str(data["fingerprint"]) != fingerprint:
+                return None
+            return cls(data["landmarks"], data["distances"], fingerprint)
+
+    def save(self, path):
+        # Through a file object, so numpy does not append ".npz" to `path`
+        with open(path, "wb") as f:
+            np.savez(f, landmarks=self.landmarks, distances=self.distances,
+                     fingerprint=self.fingerprint)
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        person indices `source` and `target`.
+
+        `upper` is None when no landmark reaches both. Both are None when
+        the landmarks prove the two people are not connected.
+        """
+        ds = self.distances[:, source].astype(np.int32)
+        dt = self.distances[:, target].astype(np.int32)
+        if np.any((ds >= 0) != (dt >= 0)):
+            return None, None
+        both = ds >= 0
+        if not both.any():
+            return 1, None
+        lower = max(int(np.abs(ds[both] - dt[both]).max()), 1)
+        upper = int((ds[both] + dt[both]).min())
+        return lower, upper
+
+    def lower_bounds(self, people, target):
+        """
+        Returns a lower bound on the distance from each of `people` (an
+        array of person indices) to `target`.
+        """
+        dp = self.distances[:, people].astype(np.int32)
+        dt = self.distances[:, [target]].astype(np.int32)
+        reached = (dp >= 0) & (dt >= 0)
+        gaps = np.where(reached, np.abs(dp - dt), 0).max(axis=0)
+        gaps[np.any((dp >= 0) != (dt >= 0), axis=0)] = UNREACHABLE
+        return gaps
+
+    def pruner(self, target, upper):
+        """
+        Returns a search filter keeping only people who, at their depth,
+        could still reach `target` within `upper` degrees.
+        """
+        def keep(people, depth):
+            return depth + self.lower_bounds(people, target) <= upper
+        return keep
+
+
+def costar_counts(graph):
+    """
+    Returns, for each person, the total cast size of their movies,
+    which is an upper bound on (and good proxy for) their co-star count.
+    """
+    person_offsets, person_movies, movie_offsets, _ = graph.arrays()
+    cast_sizes = np.diff(movie_offsets)[person_movies]
+    owners = np.repeat(np.arange(graph.num_people), np.diff(person_offsets))
+    return np.bincount(owners, weights=cast_sizes,
+                       minlength=graph.num_people)
+
+
+def graph_fingerprint(graph):
+    """
+    Returns a digest of the people and edges of `graph`.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    person_offsets, person_movies, _, _ = graph.arrays()
+    for array in (graph.person_id_array(), person_offsets, person_movies):
+        digest.update(np.ascontiguousarray(array).data)
+    return digest.hexdigest()
+
+
+def load_or_build(path, graph, k=16, processes=None):
+    """
+    Loads the index at `path`, building and saving it first if it is
+    missing or was built for different data.
+    """
+    try:
+        index = LandmarkIndex.load(path, graph)
+    except (OSError, KeyError, ValueError):
+        index = None
+    if index is None:
+        index = LandmarkIndex.build(graph, k, processes)
+        index.save(path)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python landmarks.py directory index.npz [-k K]"
+    )
+    parser.add_argument("directory")
+    parser.add_argument("path")
+    parser.add_argument("-k", type=int, default=16,
+                        help="number of landmarks (default: 16)")
+    parser.add_argument("-j", "--processes", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    import degrees
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, compact=True)
+    index = LandmarkIndex.build(degrees.graph, args.k, args.processes)
+    index.save(args.path)
+    for landmark in index.landmarks:
+        person_id = degrees.graph.person_id(landmark)
+        print(f"{person_id}: {degrees.people[person_id]['name']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+Non-interactive, ranked person lookup by exact, prefix or fuzzy name.
+
+Lowercased names are kept sorted, so exact and prefix matches are binary
+searches. Fuzzy matches come from a trigram index stored as CSR arrays
+(`gram_offsets`/`gram_keys`, and `key_gram_offsets`/`key_grams` the other
+way round), built with NumPy from integer-coded trigrams: candidates are
+gathered from the query's rarest trigrams and then scored by trigram
+overlap with the query.
+
+People added, renamed or removed after the index is built are handled by
+`refresh`: their old entries are hidden and their current ones go to a
+side index, itself a NameIndex refreshed the same way. An index is only
+rebuilt once a good share of its people have changed, so the cost of a
+refresh stays proportional to the change on average, and every query
+looks at a few small side indexes at most.
+"""
+
+import bisect
+import itertools
+
+import numpy as np
+
+# Array attributes of an index, as saved in snapshots; `keys` and
+# `person_ids` are sequences of strings
+ARRAYS = ("keys", "person_ids", "births", "key_offsets", "gram_codes",
+          "gram_offsets", "gram_keys", "gram_counts", "key_gram_offsets",
+          "key_grams")
+
+# Ranking tiers, best first
+EXACT, PREFIX, FUZZY = 0, 1, 2
+
+# Upper bound on trigram postings read per fuzzy query
+POSTINGS_BUDGET = 50000
+
+# Candidates fully scored per fuzzy query, per result asked for
+SCORED_PER_RESULT = 20
+
+# `refresh` rebuilds an index once more than 1/FOLD_FRACTION of its people,
+# and more than FOLD_LIMIT, are hidden; indices of at most FOLD_LIMIT
+# people are rebuilt on every refresh
+FOLD_FRACTION = 16
+FOLD_LIMIT = 1024
+
+
+class NameIndex():
+    """
+    Ranked lookup of people by name.
+    """
+
+    def __init__(self, entries):
+        """
+        Builds the index from (name, person_id, birth) tuples.
+        """
+        self.build(entries)
+
+    def build(self, entries):
+        """
+        (Re)builds the index from (name, person_id, birth) tuples.
+        """
+        names, person_ids, births = [], [], []
+        for name, person_id, birth in entries:
+            names.append(name.lower())
+            person_ids.append(person_id)
+            births.append(birth_key(birth))
+
+        # One key per distinct lowercased name, with its people in birth
+        # order at key_offsets[key]:key_offsets[key + 1] of the lists
+        keys, numbers = np.unique(np.array(names, dtype=str),
+                                  return_inverse=True)
+        order = np.lexsort((np.array(person_ids, dtype=str),
+                            np.array(births, dtype=np.float64), numbers))
+        self.keys = keys.tolist()
+        self.person_ids = [person_ids[i] for i in order.tolist()]
+        self.births = np.array(births, dtype=np.float64)[order]
+        self.key_offsets = np.zeros(len(self.keys) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(numbers, minlength=len(self.keys)),
+                  out=self.key_offsets[1:])
+
+        # Every (trigram, key) pair once, as CSR arrays in both directions
+        codes, owners = encode_trigrams(self.keys)
+        self.gram_codes, grams = unique(codes)
+        count = max(len(self.keys), 1)
+        pairs, _ = unique(grams * count + owners)
+        grams, owners = pairs // count, (pairs % count).astype(np.int32)
+        self.gram_offsets = np.zeros(len(self.gram_codes) + 1,
+                                     dtype=np.int64)
+        np.cumsum(np.bincount(grams, minlength=len(self.gram_codes)),
+                  out=self.gram_offsets[1:])
+        self.gram_keys = owners
+        counts = np.bincount(owners, minlength=len(self.keys))
+        self.gram_counts = counts.astype(np.int32)
+        self.key_gram_offsets = np.zeros(len(self.keys) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.key_gram_offsets[1:])
+        self.key_grams = grams[np.argsort(owners, kind="stable")]
+
+        # People whose entries above are out of date, and a side index
+        # holding their current entries (see `refresh`)
+        self.hidden = set()
+        self.extra = None
+
+    @classmethod
+    def from_people(cls, people):
+        """
+        Builds the index over a `people` dict (or view) of degrees.py.
+        """
+        return cls(
+            (person["name"], person_id, person["birth"])
+            for person_id, person in people.items()
+        )
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Builds the index over a CompactGraph.
+        """
+        return cls((name, person_id, birth)
+                   for person_id, name, birth in graph.person_records())
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        Returns an index over `arrays`, a dict keyed like ARRAYS such as
+        `arrays()` of another index, without building anything.
+        """
+        index = cls(())
+        for name in ARRAYS:
+            setattr(index, name, arrays[name])
+        return index
+
+    def arrays(self):
+        """
+        Returns the arrays of the index keyed like ARRAYS, leaving out any
+        changes made by `refresh`.
+        """
+        return {name: getattr(self, name) for name in ARRAYS}
+
+    def resolve(self, query, limit=10):
+        """
+        Returns up to `limit` person ids for `query`, best match first:
+        exact name matches, then names starting with `query` (closest in
+        length first), then names sharing the most trigrams with it.
+        People with equally good names are ordered by birth year.
+        """
+        query = query.strip().lower()
+        if not query or limit <= 0:
+            return []
+        ranked = []
+        index = self
+        while index is not None:
+            ranked.extend(index.ranked(query, limit))
+            index = index.extra
+        ranked.sort()
+        return [person_id for _, _, _, person_id in ranked[:limit]]
+
+    def ranked(self, query, limit):
+        """
+        Returns the sorted (tier, -score, birth, person_id) of up to
+        `limit` people matching lowercased `query`, leaving out hidden
+        people.
+        """
+        ranked = []
+        for tier, score, key in self.matches(query, limit):
+            for i in range(self.key_offsets[key], self.key_offsets[key + 1]):
+                person_id = self.person_ids[i]
+                if person_id not in self.hidden:
+                    ranked.append((tier, -score, float(self.births[i]),
+                                   person_id))
+        ranked.sort()
+        return ranked[:limit]
+
+    def refresh(self, person_ids, people):
+        """
+        Updates the entries of `person_ids` from `people`, a dict (or
+        view) of degrees.py, after they were added, renamed or removed.
+        """
+        person_ids = set(person_ids)
+        self.hidden.update(person_ids)
+        size = len(self.person_ids)
+        if size > FOLD_LIMIT and len(self.hidden) <= max(
+                FOLD_LIMIT, size // FOLD_FRACTION):
+            if self.extra is None:
+                self.extra = NameIndex(())
+            self.extra.refresh(person_ids, people)
+            return
+
+        entries = [entry for entry in self.entries()
+                   if entry[1] not in person_ids]
+        for person_id in person_ids:
+            if person_id in people:
+                person = people[person_id]
+                entries.append((person["name"], person_id, person["birth"]))
+        self.build(entries)
+
+    def entries(self):
+        """
+        Yields the current (name, person_id, birth) of every person in
+        this index and its side indexes, with lowercased names.
+        """
+        people = zip(self.person_ids, self.births.tolist())
+        for name, count in zip(self.keys, np.diff(self.key_offsets).tolist()):
+            for person_id, birth in itertools.islice(people, count):
+                if person_id not in self.hidden:
+                    yield name, person_id, birth
+        if self.extra is not None:
+            yield from self.extra.entries()
+
+    def live(self, key):
+        """
+        Returns True if any person under `key` is not hidden.
+        """
+        if not self.hidden:
+            return True
+        return any(self.person_ids[i] not in self.hidden
+                   for i in range(self.key_offsets[key],
+                                  self.key_offsets[key + 1]))
+
+    def matches(self, query, limit):
+        """
+        Yields (tier, score, key index) for up to `limit` keys matching
+        `query` that have people not hidden, skipping the fuzzy search if
+        enough keys start with it.
+        """
+        found = set()
+        start = bisect.bisect_left(self.keys, query)
+        for key in range(start, len(self.keys)):
+            if len(found) == limit or not self.keys[key].startswith(query):
+                break
+            if not self.live(key):
+                continue
+            found.add(key)
+            if self.keys[key] == query:
+                yield EXACT, 1.0, key
+            else:
+                yield PREFIX, len(query) / len(self.keys[key]), key
+        if len(found) == limit:
+            return
+
+        # Ask for more fuzzy matches until enough are new and not hidden
+        wanted = limit
+        while True:
+            scored = self.fuzzy(query, wanted)
+            for score, key in scored:
+                if key not in found and self.live(key):
+                    found.add(key)
+                    yield FUZZY, score, key
+                    if len(found) == limit:
+                        return
+            if len(scored) < wanted:
+                return
+            wanted *= 2
+
+    def fuzzy(self, query, limit):
+        """
+        Returns up to `limit` (score, key index) pairs, best first, scored
+        by the Dice coefficient of the query's and key's trigram sets.
+        """
+        wanted = np.unique(encode_trigrams([query])[0])
+        ids = np.searchsorted(self.gram_codes, wanted)
+        present = ids < len(self.gram_codes)
+        present[present] = self.gram_codes[ids[present]] == wanted[present]
+        ids = ids[present]
+        if not len(ids):
+            return []
+        sizes = self.gram_offsets[ids + 1] - self.gram_offsets[ids]
+        ids = ids[np.argsort(sizes, kind="stable")]
+
+        # Gather candidates from the rarest trigrams first
+        postings = []
+        read = 0
+        for gram in ids.tolist():
+            start, end = self.gram_offsets[gram], self.gram_offsets[gram + 1]
+            if postings and read + end - start > POSTINGS_BUDGET:
+                break
+            postings.append(self.gram_keys[start:end])
+            read += end - start
+        candidates, hits = np.unique(np.concatenate(postings),
+                                     return_counts=True)
+        best = np.argsort(-hits, kind="stable")[:limit * SCORED_PER_RESULT]
+        candidates = candidates[best]
+
+        # Count every trigram each candidate shares with the query
+        starts = self.key_gram_offsets[candidates]
+        counts = self.key_gram_offsets[candidates + 1] - starts
+        owners = np.repeat(np.arange(len(candidates)), counts)
+        positions = np.arange(counts.sum()) + np.repeat(
+            starts - (np.cumsum(counts) - counts), counts
+        )
+        found = np.isin(self.key_grams[positions], ids)
+        shared = np.bincount(owners[found], minlength=len(candidates))
+        scores = 2 * shared / (len(wanted) + self.gram_counts[candidates])
+
+        order = np.lexsort((candidates, -scores))[:limit]
+        return list(zip(scores[order].tolist(), candidates[order].tolist()))
+
+
+def encode_trigrams(texts):
+    """
+    Returns (codes, owners): an int64 code for every trigram of every
+    text in `texts`, and the position in `texts` of the text it came
+    from. Texts are padded so that short names and word boundaries
+    produce trigrams too. A code packs three code points into 21 bits
+    each.
+    """
+    padded = [f"  {text} " for text in texts]
+    lengths = np.array([len(text) for text in padded], dtype=np.int64)
+    points = np.frombuffer("".join(padded).encode("utf-32-le"),
+                           dtype=np.uint32).astype(np.int64)
+    owners = np.repeat(np.arange(len(padded)), lengths)
+    within = np.arange(len(points)) - np.repeat(np.cumsum(lengths) - lengths,
+                                                lengths)
+    starts = np.flatnonzero(within <= lengths[owners] - 3)
+    codes = (points[starts] << 42) | (points[starts + 1] << 21) \
+        | points[starts + 2]
+    return codes, owners[starts]
+
+
+def unique(values):
+    """
+    Returns (sorted distinct values, position of each value among them)
+    of an int64 array. Sorting is much faster than `np.unique` on large
+    integer arrays.
+    """
+    order = np.argsort(values, kind="stable")
+    ordered = values[order]
+    first = np.ones(len(ordered), dtype=bool)
+    first[1:] = ordered[1:] != ordered[:-1]
+    positions = np.empty(len(values), dtype=np.int64)
+    positions[order] = np.cumsum(first) - 1
+    return ordered[first], positions
+
+
+def birth_key(birth):
+    """
+    Sort key for a birth year column: known years first, earliest first.
+    """
+    try:
+        return int(birth)
+    except (TypeError, ValueError, OverflowError):
+        return float("inf")
@@ -0,0 +1,286 @@
+"""
+Batch and server front ends for degrees-of-separation queries.
+
+Both answer queries against an already loaded `degrees` module (passed in
+as `db`), so the dataset is loaded once and shared by every query. Each
+answer is a JSON object:
+
+    {"source": ..., "target": ..., "degrees": 2, "path": [...]}
+
+or, when a name cannot be resolved, one with an "error" key instead.
+"""
+
+import json
+import os
+import socketserver
+import sys
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class PathCache():
+    """
+    Thread-safe LRU cache of shortest paths keyed by (source, target).
+    """
+
+    def __init__(self, size=65536):
+        self.size = size
+        self.paths = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.paths)
+
+    def get(self, source, target):
+        """
+        Returns (True, path) for a cached pair, (False, None) otherwise.
+        """
+        with self.lock:
+            try:
+                path = self.paths[(source, target)]
+            except KeyError:
+                return False, None
+            self.paths.move_to_end((source, target))
+            return True, path
+
+    def put(self, source, target, path):
+        with self.lock:
+            self.paths[(source, target)] = path
+            self.paths.move_to_end((source, target))
+            while len(self.paths) > self.size:
+                self.paths.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.paths.clear()
+
+    def discard(self, people=(), movies=()):
+        """
+        Drops every cached path that starts or ends at, or passes through,
+        any of `people` or `movies`.
+        """
+        people, movies = set(people), set(movies)
+        with self.lock:
+            stale = [
+                key for key, path in self.paths.items()
+                if not people.isdisjoint(key) or (path is not None and any(
+                    movie_id in movies or person_id in people
+                    for movie_id, person_id in path
+                ))
+            ]
+            for key in stale:
+                del self.paths[key]
+
+
+def cached_shortest_path(db, source, target):
+    """
+    Returns `db.shortest_path(source, target)`, through `db.path_cache`.
+    """
+    hit, path = db.path_cache.get(source, target)
+    if not hit:
+        path = db.shortest_path(source, target)
+        db.path_cache.put(source, target, path)
+    return path
+
+
+def answer(db, source_name, target_name):
+    """
+    Answers one query for the people named `source_name` and `target_name`.
+    """
+    result = {"source": source_name, "target": target_name}
+    ids = []
+    for role, name in (("source", source_name), ("target", target_name)):
+        person_ids = db.person_ids_for_name(name)
+        if len(person_ids) == 0:
+            result["error"] = f"{role} person not found"
+            result["suggestions"] = describe(db, db.resolve_name(name, 5))
+            return result
+        if len(person_ids) > 1:
+            result["error"] = f"{role} name is ambiguous"
+            result["candidates"] = describe(db, sorted(person_ids))
+            return result
+        ids.append(person_ids[0])
+
+    source, target = ids
+    if source == target:
+        path = []
+    else:
+        path = cached_shortest_path(db, source, target)
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+        return result
+
+    result["degrees"] = len(path)
+    result["path"] = [
+        {
+            "movie_id": movie_id,
+            "movie": db.movies[movie_id]["title"],
+            "person_id": person_id,
+            "person": db.people[person_id]["name"]
+        }
+        for movie_id, person_id in path
+    ]
+    return result
+
+
+def describe(db, person_ids):
+    """
+    Returns the id, name and birth of each of `person_ids`.
+    """
+    return [
+        {
+            "id": person_id,
+            "name": db.people[person_id]["name"],
+            "birth": db.people[person_id]["birth"]
+        }
+        for person_id in person_ids
+    ]
+
+
+def parse_query(line):
+    """
+    Returns the (source, target) names of one query line, which is either
+    a JSON object with "source" and "target" keys or two tab-separated
+    names. Returns None for blank lines.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        query = json.loads(line)
+        source, target = query["source"], query["target"]
+        if not isinstance(source, str) or not isinstance(target, str):
+            raise ValueError("names must be strings")
+        return source, target
+    source, target = line.split("\t")
+    return source, target
+
+
+def answer_lines(db, lines):
+    """
+    Yields an answer for every query line in `lines`, skipping blank ones.
+    """
+    for number, line in enumerate(lines, 1):
+        try:
+            query = parse_query(line)
+        except (ValueError, KeyError):
+            yield {"line": number, "error": "malformed query"}
+            continue
+        if query is not None:
+            yield answer(db, *query)
+
+
+def run_batch(db, lines, out):
+    """
+    Answers every query in `lines`, writing one JSON line per query to `out`.
+    """
+    for result in answer_lines(db, lines):
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    HTTP handler answering `GET /path?source=...&target=...` with one JSON
+    answer, and `POST /path` with a body of query lines (as read by
+    `run_batch`) with one JSON line per query.
+
+    `GET /names?q=...[&limit=N]` returns the people best matching a
+    partial or misspelled name, for autocompletion.
+    """
+
+    # Set on the handler subclass built by `serve`
+    db = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path == "/names":
+            self.names(params)
+            return
+        if url.path != "/path":
+            self.send_error(404)
+            return
+        try:
+            source, target = params["source"][0], params["target"][0]
+        except KeyError:
+            self.send_error(400, "source and target are required")
+            return
+        self.reply([answer(self.db, source, target)])
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/path":
+            self.send_error(404)
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if length < 0:
+                raise ValueError(length)
+        except ValueError:
+            self.send_error(400, "Content-Length must be a number")
+            return
+        try:
+            lines = self.rfile.read(length).decode("utf-8").splitlines()
+        except UnicodeDecodeError:
+            self.send_error(400, "the body must be UTF-8")
+            return
+        self.reply(answer_lines(self.db, lines))
+
+    def names(self, params):
+        try:
+            query = params["q"][0]
+            limit = int(params.get("limit", ["10"])[0])
+        except (KeyError, ValueError):
+            self.send_error(400, "q is required and limit must be a number")
+            return
+        people = describe(self.db, self.db.resolve_name(query, limit))
+        self.reply([{"query": query, "people": people}])
+
+    def reply(self, results):
+        body = "".join(json.dumps(result) + "\n" for result in results)
+        body = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        if isinstance(self.client_address, tuple):
+            return super().address_string()
+        return "unix"
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn,
+                              socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(db, address=None, socket_path=None):
+    """
+    Serves queries until interrupted, on TCP `address` ("[HOST:]PORT",
+    host defaulting to localhost) or on the Unix socket `socket_path`.
+    Each connection is handled on its own thread.
+    """
+    handler = type("Handler", (QueryHandler,), {"db": db})
+    if socket_path is not None:
+        server = ThreadingUnixHTTPServer(socket_path, handler)
+        where = socket_path
+    else:
+        host, _, port = address.rpartition(":")
+        server = ThreadingHTTPServer((host or "localhost", int(port)),
+                                     handler)
+        where = f"http://{host or 'localhost'}:{port}/path"
+    print(f"Serving on {where}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path is not None:
+            os.unlink(socket_path)
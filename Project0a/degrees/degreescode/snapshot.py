@@ -0,0 +1,281 @@
+"""
+Binary snapshots of a CompactGraph, stored beside the CSVs they came from.
+
+A snapshot is a directory of `.npy` files, one per array, that are memory
+mapped on load, plus a `manifest.json` recording the snapshot format
+version and the size and mtime of every source CSV. A snapshot is only
+used while all three match, so editing a CSV transparently forces a
+rebuild on the next load.
+
+Deltas (see delta.py) applied since the snapshot was written are logged
+beside it as numbered JSON files, counted in the manifest, and replayed
+onto the graph's overlay on load.
+
+The snapshot also holds the arrays of a NameIndex over the graph's people,
+so batch and server runs start without building one.
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+
+from graph import CompactGraph, PeopleView, StringTable
+from nameindex import ARRAYS as NAME_ARRAYS, NameIndex
+
+# Bump whenever the on-disk layout changes
+SNAPSHOT_VERSION = 3
+
+SNAPSHOT_DIRECTORY = ".snapshot"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+# CompactGraph array attributes, saved as-is
+ARRAYS = ("person_offsets", "person_movies", "movie_offsets", "movie_stars",
+          "name_people")
+
+# NameIndex arrays that are sequences of strings, saved as StringTables
+NAME_STRINGS = ("keys", "person_ids")
+
+# Vertex columns that are StringTables rather than arrays
+STRING_COLUMNS = {
+    "people": ("name", "birth"),
+    "movies": ("title", "year")
+}
+
+
+def snapshot_path(directory):
+    return os.path.join(directory, SNAPSHOT_DIRECTORY)
+
+
+def source_stats(directory):
+    """
+    Returns the (mtime_ns, size) of every source CSV in `directory`.
+    """
+    stats = {}
+    for source in SOURCES:
+        stat = os.stat(os.path.join(directory, source))
+        stats[source] = [stat.st_mtime_ns, stat.st_size]
+    return stats
+
+
+def read_manifest(directory):
+    """
+    Returns the manifest of the snapshot of `directory`, or None if there
+    is no snapshot, it was written by another version, or any source CSV
+    changed since it was written.
+    """
+    try:
+        with open(os.path.join(snapshot_path(directory),
+                               "manifest.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        return None
+    if manifest.get("sources") != source_stats(directory):
+        return None
+    return manifest
+
+
+def write_manifest(path, manifest):
+    """
+    Writes the manifest of the snapshot directory `path` atomically.
+    """
+    staging = os.path.join(path, f"manifest.{os.getpid()}.tmp")
+    with open(staging, "w") as f:
+        json.dump(manifest, f)
+    os.replace(staging, os.path.join(path, "manifest.json"))
+
+
+def delta_path(path, number):
+    return os.path.join(path, f"delta-{number:06d}.json")
+
+
+def load_snapshot(directory):
+    """
+    Memory-maps the snapshot of `directory` into a CompactGraph, and
+    replays its logged deltas.
+
+    Returns None if there is no current snapshot (see `read_manifest`).
+    """
+    # delta.py imports this module
+    from delta import patch_graph
+
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return None
+    path = snapshot_path(directory)
+    array, strings = loaders(path)
+
+    people = {"id": array("people.id")}
+    movies = {"id": array("movies.id")}
+    for kind, vertices in (("people", people), ("movies", movies)):
+        for column in STRING_COLUMNS[kind]:
+            vertices[column] = strings(f"{kind}.{column}")
+
+    arrays = {name: array(name) for name in ARRAYS}
+    graph = CompactGraph(
+        people, movies,
+        arrays["person_offsets"], arrays["person_movies"],
+        arrays["movie_offsets"], arrays["movie_stars"],
+        strings("name_keys"), arrays["name_people"]
+    )
+    for delta in logged_deltas(path, manifest):
+        patch_graph(graph, delta)
+    return graph
+
+
+def load_name_index(directory, graph):
+    """
+    Memory-maps the NameIndex saved in the snapshot of `directory`, and
+    refreshes it with the people changed by the logged deltas, which
+    `graph` (as returned by `load_snapshot`) already includes.
+
+    Returns None if there is no current snapshot.
+    """
+    from delta import changed_people
+
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return None
+    array, strings = loaders(snapshot_path(directory))
+    index = NameIndex.from_arrays({
+        name: strings(f"names.{name}") if name in NAME_STRINGS
+        else array(f"names.{name}")
+        for name in NAME_ARRAYS
+    })
+    changed = []
+    for delta in logged_deltas(snapshot_path(directory), manifest):
+        changed.extend(changed_people(delta))
+    if changed:
+        index.refresh(changed, PeopleView(graph))
+    return index
+
+
+def loaders(path):
+    """
+    Returns functions memory-mapping an array, and a StringTable, by name
+    from the snapshot directory `path`.
+    """
+    def array(name):
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+    def strings(name):
+        return StringTable(array(f"{name}.offsets"), array(f"{name}.data"))
+
+    return array, strings
+
+
+def logged_deltas(path, manifest):
+    """
+    Yields the Delta of every change logged in the snapshot directory
+    `path`, oldest first.
+    """
+    from delta import Delta
+
+    for number in range(1, manifest.get("deltas", 0) + 1):
+        with open(delta_path(path, number), encoding="utf-8") as f:
+            yield Delta(**json.load(f))
+
+
+def append_delta(directory, changes):
+    """
+    Logs `changes`, the row lists of a delta keyed like `delta.FILES`, in
+    the snapshot of `directory`. Returns False if there is no current
+    snapshot.
+    """
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return False
+    path = snapshot_path(directory)
+    number = manifest.get("deltas", 0) + 1
+    with open(delta_path(path, number), "w", encoding="utf-8") as f:
+        json.dump(changes, f)
+
+    # The delta only counts once the manifest says so
+    manifest["deltas"] = number
+    write_manifest(path, manifest)
+    return True
+
+
+def save_snapshot(directory, graph, stats=None):
+    """
+    Writes `graph` as the snapshot of `directory`.
+
+    `stats` are the source CSV stats to record, and default to the current
+    ones. The snapshot is written to a temporary directory and moved into
+    place, so readers never see a partial snapshot; the old snapshot is
+    renamed aside first and only then removed. A graph with an overlay is
+    compacted first.
+
+    Returns the NameIndex saved with it.
+    """
+    graph = graph.compacted()
+    name_index = NameIndex.from_graph(graph)
+    if stats is None:
+        stats = source_stats(directory)
+    path = snapshot_path(directory)
+    staging = f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    try:
+        write_arrays(staging, graph, name_index)
+
+        # The manifest goes last: a snapshot without one is never loaded
+        write_manifest(staging, {"version": SNAPSHOT_VERSION,
+                                 "sources": stats, "deltas": 0})
+        swap(staging, path)
+    finally:
+        # Only left behind if writing or swapping failed
+        shutil.rmtree(staging, ignore_errors=True)
+    return name_index
+
+
+def write_arrays(staging, graph, name_index):
+    """
+    Saves the arrays of a compacted `graph`, and of `name_index`, in the
+    directory `staging`.
+    """
+    def save(name, array):
+        np.save(os.path.join(staging, f"{name}.npy"), np.asarray(array))
+
+    def save_strings(name, table):
+        save(f"{name}.offsets", table.offsets)
+        save(f"{name}.data", table.data)
+
+    for kind, vertices in (("people", graph.people),
+                           ("movies", graph.movies)):
+        save(f"{kind}.id", vertices["id"])
+        for column in STRING_COLUMNS[kind]:
+            save_strings(f"{kind}.{column}", vertices[column])
+    for name in ARRAYS:
+        save(name, getattr(graph, name))
+    save_strings("name_keys", graph.name_keys)
+    for name, array in name_index.arrays().items():
+        if name in NAME_STRINGS:
+            save_strings(f"names.{name}", StringTable.from_strings(array))
+        else:
+            save(f"names.{name}", array)
+
+
+def swap(staging, path):
+    """
+    Moves the directory `staging` to `path`, replacing any directory there.
+    """
+    retired = f"{path}.{os.getpid()}.old"
+    shutil.rmtree(retired, ignore_errors=True)
+    try:
+        os.replace(path, retired)
+    except FileNotFoundError:
+        retired = None
+    try:
+        os.replace(staging, path)
+    except OSError:
+        # Another writer got there first; keep its snapshot
+        if retired is not None and not os.path.exists(path):
+            os.replace(retired, path)
+        raise
+    finally:
+        if retired is not None:
+            shutil.rmtree(retired, ignore_errors=True)
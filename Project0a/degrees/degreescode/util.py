@@ -1,3 +1,8 @@
+import heapq
+import itertools
+from collections import Counter, deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -7,13 +12,17 @@ class Node():
 
 class StackFrontier():
     def __init__(self):
-        self.frontier = []
+        self.frontier = deque()
+
+        # Number of nodes in the frontier with each state
+        self.states = Counter()
 
     def add(self, node):
         self.frontier.append(node)
+        self.states[node.state] += 1
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return state in self.states
 
     def empty(self):
         return len(self.frontier) == 0
@@ -22,17 +31,40 @@ class StackFrontier():
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
+            node = self.pop()
+            self.discard(node.state)
             return node
 
+    def pop(self):
+        return self.frontier.pop()
+
+    def discard(self, state):
+        self.states[state] -= 1
+        if not self.states[state]:
+            del self.states[state]
+
 
 class QueueFrontier(StackFrontier):
 
-    def remove(self):
-        if self.empty():
-            raise Exception("empty frontier")
-        else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
-            return node
+    def pop(self):
+        return self.frontier.popleft()
+
+
+class PriorityFrontier(StackFrontier):
+    """
+    Frontier that removes the node with the lowest priority first,
+    and nodes of equal priority in the order they were added.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.frontier = []
+        self.counter = itertools.count()
+
+    def add(self, node, priority=0):
+        heapq.heappush(self.frontier, (priority, next(self.counter), node))
+        self.states[node.state] += 1
+
+    def pop(self):
+        _, _, node = heapq.heappop(self.frontier)
+        return node
@@ -0,0 +1,223 @@
+"""
+Headless self-play benchmark for the Tic Tac Toe engines.
+
+Plays a number of games, AI against AI or AI against a random player, and
+reports the nodes searched, nodes per second, per-move latency percentiles
+and transposition table hit rates of the AI's moves. With --json the
+results are also written in machine-readable form, for comparing releases.
+For the mcts engine, nodes are playouts and a "hit" is a move that reused
+the previous move's search tree. The book engine does no search, so it
+reports none of these search statistics.
+
+Usage: python benchmark.py [--games N] [--opponent ai|random]
+                           [--engine book|alphabeta|mcts]
+                           [--rows R --cols C -k K] [--json FILE]
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+import mcts
+import mnk
+import tictactoe as ttt
+
+# Latency percentiles reported
+PERCENTILES = (50, 90, 99)
+
+
+def make_game(args):
+    """
+    Returns the engine to benchmark: the tictactoe module (answering from
+    its book), an mcts.Game or an mnk.Game.
+    """
+    if args.engine == "book":
+        if (args.rows, args.cols, args.k) != (3, 3, 3):
+            sys.exit("The book engine only plays 3x3 Tic Tac Toe.")
+        return ttt
+    if args.engine == "mcts":
+        return mcts.Game(args.rows, args.cols, args.k, args.time_limit,
+                         playouts=args.playouts, seed=args.seed)
+    return mnk.Game(args.rows, args.cols, args.k, args.time_limit,
+                    processes=args.processes)
+
+
+def search_stats(game):
+    """
+    Returns (nodes, probes, hits, depth) for the engine's last move, or
+    None if the engine does not search (the book).
+    """
+    search = getattr(game, "last_search", None)
+    if search is None:
+        return None
+    return search.nodes, search.probes, search.hits, search.depth
+
+
+def play_game(game, players, rng, moves):
+    """
+    Plays one game where `players` maps X and O to "ai" or "random",
+    appending a record of every AI move to `moves`.
+
+    Returns the winner, or None for a draw.
+    """
+    board = game.initial_state()
+    while not game.terminal(board):
+        player = game.player(board)
+        if players[player] == "random":
+            action = rng.choice(sorted(game.actions(board)))
+        else:
+            start = time.perf_counter()
+            action = game.minimax(board)
+            seconds = time.perf_counter() - start
+            move = {"seconds": seconds}
+            stats = search_stats(game)
+            if stats is not None:
+                nodes, probes, hits, depth = stats
+                move.update(nodes=nodes, probes=probes, hits=hits,
+                            depth=depth)
+            moves.append(move)
+        board = game.result(board, action)
+    return game.winner(board)
+
+
+def percentile(values, p):
+    """
+    Returns the `p`th percentile of `values` by the nearest-rank method.
+    """
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[rank - 1]
+
+
+def summarize(moves, outcomes, seconds):
+    """
+    Returns the benchmark results as a dict. The search statistics are
+    None unless every move recorded them.
+    """
+    thinking = sum(move["seconds"] for move in moves)
+    latencies = [move["seconds"] * 1000 for move in moves]
+    results = {
+        "games": sum(outcomes.values()),
+        "outcomes": outcomes,
+        "moves": len(moves),
+        "wall_seconds": seconds,
+        "search_seconds": thinking,
+        "latency_ms": {
+            **{f"p{p}": percentile(latencies, p) if moves else 0.0
+               for p in PERCENTILES},
+            "max": max(latencies, default=0.0),
+            "mean": thinking * 1000 / len(moves) if moves else 0.0
+        },
+        "nodes": None,
+        "nodes_per_second": None,
+        "tt_probes": None,
+        "tt_hits": None,
+        "tt_hit_rate": None,
+        "mean_depth": None
+    }
+    if not all("nodes" in move for move in moves):
+        return results
+
+    nodes = sum(move["nodes"] for move in moves)
+    probes = sum(move["probes"] for move in moves)
+    hits = sum(move["hits"] for move in moves)
+    results.update({
+        "nodes": nodes,
+        "nodes_per_second": nodes / thinking if thinking else 0.0,
+        "tt_probes": probes,
+        "tt_hits": hits,
+        "tt_hit_rate": hits / probes if probes else 0.0,
+        "mean_depth": (sum(move["depth"] for move in moves) / len(moves)
+                       if moves else 0.0)
+    })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Tic Tac Toe engines by self-play."
+    )
+    parser.add_argument("-n", "--games", type=int, default=10)
+    parser.add_argument("--opponent", choices=("ai", "random"), default="ai",
+                        help="play the AI against itself or a random player")
+    parser.add_argument("--engine", choices=("book", "alphabeta", "mcts"),
+                        help="default: book for 3x3 Tic Tac Toe, "
+                             "alphabeta otherwise")
+    parser.add_argument("--rows", type=int, default=3)
+    parser.add_argument("--cols", type=int, default=3)
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--time-limit", type=float, default=1.0,
+                        help="seconds per alphabeta or mcts move")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--playouts", type=int,
+                        help="mcts playouts per move "
+                             "(default: use the time limit)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="FILE",
+                        help="also write the results as JSON to FILE "
+                             "(- for stdout)")
+    args = parser.parse_args()
+    if args.engine is None:
+        args.engine = ("book" if (args.rows, args.cols, args.k) == (3, 3, 3)
+                       else "alphabeta")
+
+    game = make_game(args)
+    rng = random.Random(args.seed)
+    moves = []
+    outcomes = {"X": 0, "O": 0, "draw": 0}
+    start = time.perf_counter()
+    try:
+        for number in range(args.games):
+            if args.opponent == "ai":
+                players = {ttt.X: "ai", ttt.O: "ai"}
+            elif number % 2 == 0:
+                players = {ttt.X: "ai", ttt.O: "random"}
+            else:
+                players = {ttt.X: "random", ttt.O: "ai"}
+            winner = play_game(game, players, rng, moves)
+            outcomes[winner or "draw"] += 1
+            print(f"Game {number + 1}: {winner or 'draw'}", file=sys.stderr)
+    finally:
+        if game is not ttt:
+            game.close()
+    results = summarize(moves, outcomes, time.perf_counter() - start)
+    results["config"] = {
+        **vars(args), "python": platform.python_version()
+    }
+    del results["config"]["json"]
+
+    # The summary goes to stderr when the JSON goes to stdout
+    out = sys.stderr if args.json == "-" else sys.stdout
+    latency = results["latency_ms"]
+    print(f"Games: {results['games']} (X {outcomes['X']}, "
+          f"O {outcomes['O']}, draws {outcomes['draw']})", file=out)
+    print(f"AI moves: {results['moves']} in "
+          f"{results['search_seconds']:.2f}s", file=out)
+    if results["nodes"] is None:
+        print("Nodes: n/a (no search)", file=out)
+    else:
+        print(f"Nodes: {results['nodes']:,} "
+              f"({results['nodes_per_second']:,.0f} nodes/s)", file=out)
+    print("Latency (ms): " + " ".join(
+        f"{name} {value:.2f}" for name, value in latency.items()
+    ), file=out)
+    if results["tt_probes"] is None:
+        print("TT hit rate: n/a (no search)", file=out)
+    else:
+        print(f"TT hit rate: {results['tt_hit_rate']:.1%} "
+              f"({results['tt_hits']:,} of {results['tt_probes']:,} probes)",
+              file=out)
+
+    if args.json == "-":
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Bitboard Tic Tac Toe
+
+A board is a pair of 9-bit integers (x, o). Bit 3 * i + j of `x` is set
+when X occupies cell (i, j), and likewise for `o`. Every function of
+tictactoe.py has a counterpart here working on bitboards, and
+`from_board`/`to_board` convert between the two representations.
+"""
+
+X = "X"
+O = "O"
+EMPTY = None
+
+FULL = 0b111111111
+
+# Rows, columns and diagonals, as bitmasks
+WIN_MASKS = (
+    [0b111 << (3 * i) for i in range(3)]
+    + [0b001001001 << j for j in range(3)]
+    + [0b100010001, 0b001010100]
+)
+
+# Lookup tables over every 9-bit mask
+POPCOUNT = [bin(mask).count("1") for mask in range(FULL + 1)]
+WINNING = [any(mask & win == win for win in WIN_MASKS)
+           for mask in range(FULL + 1)]
+CELLS = [[cell for cell in range(9) if mask & (1 << cell)]
+         for mask in range(FULL + 1)]
+
+# Symmetries of the board (identity, three rotations, four reflections),
+# as the cell each cell is moved to
+SYMMETRIES = [
+    [3 * a + b for a, b in cells] for cells in (
+        [(i, j) for i in range(3) for j in range(3)],
+        [(j, 2 - i) for i in range(3) for j in range(3)],
+        [(2 - i, 2 - j) for i in range(3) for j in range(3)],
+        [(2 - j, i) for i in range(3) for j in range(3)],
+        [(i, 2 - j) for i in range(3) for j in range(3)],
+        [(2 - i, j) for i in range(3) for j in range(3)],
+        [(j, i) for i in range(3) for j in range(3)],
+        [(2 - j, 2 - i) for i in range(3) for j in range(3)]
+    )
+]
+
+# Each symmetry applied to every 9-bit mask
+TRANSFORMS = [
+    [sum(1 << symmetry[cell] for cell in CELLS[mask])
+     for mask in range(FULL + 1)]
+    for symmetry in SYMMETRIES
+]
+
+# Transposition table: canonical board key to its minimax value.
+# Values only depend on the position, so the table is kept across
+# moves and games.
+transpositions = {}
+
+
+def from_board(board):
+    """
+    Returns the bitboard of a list-of-lists board.
+    """
+    x = o = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == X:
+                x |= 1 << (3 * i + j)
+            elif board[i][j] == O:
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def to_board(board):
+    """
+    Returns the list-of-lists board of a bitboard.
+    """
+    x, o = board
+    return [[X if x >> (3 * i + j) & 1 else O if o >> (3 * i + j) & 1
+             else EMPTY for j in range(3)] for i in range(3)]
+
+
+def initial_state():
+    """
+    Returns starting state of the board.
+    """
+    return 0, 0
+
+
+def player(board):
+    """
+    Returns player who has the next turn on a board.
+    """
+    x, o = board
+    return X if POPCOUNT[x] == POPCOUNT[o] else O
+
+
+def actions(board):
+    """
+    Returns set of all possible actions (i, j) available on the board.
+    """
+    x, o = board
+    return {divmod(cell, 3) for cell in CELLS[FULL & ~(x | o)]}
+
+
+def result(board, action):
+    """
+    Returns the board that results from making move (i, j) on the board.
+    """
+    i, j = action
+    x, o = board
+    if not (0 <= i < 3 and 0 <= j < 3) or (x | o) >> (3 * i + j) & 1:
+        raise Exception("Invalid Move")
+    return play(board, 3 * i + j)
+
+
+def play(board, cell):
+    """
+    Returns the board after the player to move takes `cell`.
+    """
+    x, o = board
+    if POPCOUNT[x] == POPCOUNT[o]:
+        return x | 1 << cell, o
+    return x, o | 1 << cell
+
+
+def winner(board):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    x, o = board
+    if WINNING[x]:
+        return X
+    if WINNING[o]:
+        return O
+    return None
+
+
+def terminal(board):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    x, o = board
+    return (x | o) == FULL or WINNING[x] or WINNING[o]
+
+
+def utility(board):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    x, o = board
+    return 1 if WINNING[x] else -1 if WINNING[o] else 0
+
+
+def board_key(board):
+    """
+    Returns a key shared by a board and all its rotations and reflections.
+    """
+    x, o = board
+    return min(transform[x] | transform[o] << 9 for transform in TRANSFORMS)
+
+
+def value(board):
+    """
+    Returns the minimax value of a board: 1 if X wins with perfect play,
+    -1 if O does, 0 for a draw.
+    """
+    key = board_key(board)
+    if key in transpositions:
+        return transpositions[key]
+    x, o = board
+    if WINNING[x]:
+        best = 1
+    elif WINNING[o]:
+        best = -1
+    elif (x | o) == FULL:
+        best = 0
+    elif POPCOUNT[x] == POPCOUNT[o]:
+        best = -1
+        for cell in CELLS[FULL & ~(x | o)]:
+            best = max(best, value((x | 1 << cell, o)))
+            if best == 1:
+                break
+    else:
+        best = 1
+        for cell in CELLS[FULL & ~(x | o)]:
+            best = min(best, value((x, o | 1 << cell)))
+            if best == -1:
+                break
+    transpositions[key] = best
+    return best
+
+
+def minimax(board):
+    """
+    Returns the optimal action for the current player on the board.
+    """
+    if terminal(board):
+        return None
+    x, o = board
+    sign = 1 if POPCOUNT[x] == POPCOUNT[o] else -1
+    best_cell, best = None, -2
+    for cell in CELLS[FULL & ~(x | o)]:
+        score = sign * value(play(board, cell))
+        if score > best:
+            best_cell, best = cell, score
+            if best == 1:
+                break
+    return divmod(best_cell, 3)
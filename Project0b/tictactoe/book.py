@@ -0,0 +1,107 @@
+"""
+Perfect-play book for Tic Tac Toe
+
+Every position reachable from the empty board is solved once with the
+bitboard engine and its best move stored under the position's symmetry
+canonical key (see `bitboard.board_key`), so finding the best move is a
+single lookup. Run this file to rebuild the book.json asset.
+
+Usage: python book.py [output]
+"""
+
+import json
+import os
+import sys
+
+import bitboard
+
+BOOK_VERSION = 1
+
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "book.json")
+
+
+def solve():
+    """
+    Returns a dict mapping the canonical key of every reachable,
+    non-terminal position to its best move, as a cell index in the
+    canonical orientation.
+    """
+    book = {}
+    frontier = [bitboard.initial_state()]
+    while frontier:
+        board = frontier.pop()
+        key, symmetry = canonical(board)
+        if key in book or bitboard.terminal(board):
+            continue
+
+        # Solve the canonical orientation so the stored cell needs no
+        # further transforming
+        canonical_board = (key & bitboard.FULL, key >> 9)
+        i, j = bitboard.minimax(canonical_board)
+        book[key] = 3 * i + j
+
+        x, o = board
+        for cell in bitboard.CELLS[bitboard.FULL & ~(x | o)]:
+            frontier.append(bitboard.play(board, cell))
+    return book
+
+
+def canonical(board):
+    """
+    Returns (key, symmetry): the canonical key of a bitboard and the index
+    of the symmetry in `bitboard.SYMMETRIES` that maps the board onto it.
+    """
+    x, o = board
+    return min(
+        (transform[x] | transform[o] << 9, symmetry)
+        for symmetry, transform in enumerate(bitboard.TRANSFORMS)
+    )
+
+
+def lookup(book, board):
+    """
+    Returns the best action (i, j) for a bitboard, or None if the game
+    is over.
+    """
+    key, symmetry = canonical(board)
+    cell = book.get(key)
+    if cell is None:
+        return None
+    return divmod(bitboard.SYMMETRIES[symmetry].index(cell), 3)
+
+
+def save(book, path=BOOK_PATH):
+    with open(path, "w") as f:
+        json.dump({
+            "version": BOOK_VERSION,
+            "moves": {str(key): cell for key, cell in sorted(book.items())}
+        }, f, separators=(",", ":"))
+
+
+def load(path=BOOK_PATH):
+    """
+    Returns the book stored at `path`, solving it afresh if the file is
+    missing or was written by another version.
+    """
+    try:
+        with open(path) as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return solve()
+    if stored.get("version") != BOOK_VERSION:
+        return solve()
+    return {int(key): cell for key, cell in stored["moves"].items()}
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python book.py [output]")
+    path = sys.argv[1] if len(sys.argv) == 2 else BOOK_PATH
+    book = solve()
+    save(book, path)
+    print(f"Wrote {len(book)} positions to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Monte Carlo Tree Search player for m,n,k-games.
+
+`Game` is an mnk.Game whose `minimax` picks moves by UCT instead of
+alpha-beta, for boards too large to search exhaustively. Every expansion
+is scored by a batch of random playouts run at once as NumPy arrays: each
+playout fills the empty cells in a random order, and the winner is whoever
+completed a line first. The tree is kept between moves and reused when
+the next board follows on from the last one.
+"""
+
+import math
+import time
+
+import numpy as np
+
+import mnk
+from mnk import EMPTY, O, X
+
+# Exploration constant of the UCT formula
+EXPLORATION = math.sqrt(2)
+
+# Iterations between progress reports
+REPORT_EVERY = 16
+
+
+class Node():
+    """
+    A node of the search tree: the position after `player` played `move`.
+    `reward` sums `player`'s mean result over the `visits` batches of
+    playouts through the node, counting a win as 1 and a draw as 0.5.
+    """
+
+    def __init__(self, parent, move, player, untried, winner=None):
+        self.parent = parent
+        self.move = move
+        self.player = player
+        self.untried = untried
+        self.winner = winner
+        self.terminal = winner is not None or not untried
+        self.children = {}
+        self.visits = 0
+        self.reward = 0.0
+
+    def select(self):
+        """
+        Returns the child with the best UCT score.
+        """
+        log_visits = math.log(self.visits)
+        return max(
+            self.children.values(),
+            key=lambda child: (child.reward / child.visits
+                               + EXPLORATION
+                               * math.sqrt(log_visits / child.visits))
+        )
+
+
+class Game(mnk.Game):
+    """
+    An m,n,k-game played by Monte Carlo Tree Search.
+    """
+
+    def __init__(self, rows=3, cols=3, k=3, time_limit=1.0, playouts=None,
+                 batch=64, seed=None):
+        """
+        Each move runs `playouts` random playouts, or as many as fit in
+        `time_limit` seconds if `playouts` is None, `batch` at a time.
+        """
+        super().__init__(rows, cols, k, time_limit)
+        self.playouts = playouts
+        self.batch = batch
+        self.rng = np.random.default_rng(seed)
+        self.window_array = np.array(self.windows, dtype=np.intp)
+
+        # Tree of the previous move, and the cells it was searched from
+        self.tree = None
+        self.tree_cells = None
+
+    def minimax(self, board, stop=None, progress=None):
+        """
+        Returns the most visited action for the current player on the
+        board. `stop` and `progress` are as for mnk.Game.minimax, with the
+        depth reported being the depth of the tree.
+        """
+        if self.terminal(board):
+            return None
+        search = Search(self, self.position(board), stop, progress)
+        move = search.run()
+        self.last_search = search
+        return divmod(move, self.cols)
+
+    def reuse(self, position):
+        """
+        Returns the subtree of the previous search for `position`, or None
+        if `position` does not follow on from the previous root.
+        """
+        if self.tree is None:
+            return None
+        added = {X: [], O: []}
+        for cell, (old, new) in enumerate(zip(self.tree_cells,
+                                              position.cells)):
+            if old != new:
+                if old != EMPTY:
+                    return None
+                added[new].append(cell)
+
+        # Walk down the new moves, alternating players from the old root
+        node = self.tree
+        player = O if node.player == X else X
+        while added[player]:
+            node = node.children.get(added[player].pop())
+            if node is None:
+                return None
+            player = O if player == X else X
+        if added[X] or added[O]:
+            return None
+        node.parent = None
+        return node
+
+    def new_node(self, parent, move, player, position, won):
+        empties = [cell for cell, piece in enumerate(position.cells)
+                   if piece == EMPTY]
+        self.rng.shuffle(empties)
+        return Node(parent, move, player, [] if won else empties,
+                    player if won else None)
+
+
+class Search():
+    """
+    One UCT search from `position`. `nodes` counts playouts, and `hits`
+    is 1 if a subtree of the previous search was reused (of 1 `probe`).
+    """
+
+    def __init__(self, game, position, stop=None, progress=None):
+        self.game = game
+        self.position = position
+        self.stop = stop
+        self.progress = progress
+        self.nodes = 0
+        self.probes = 1
+        self.hits = 0
+        self.depth = 0
+
+    def run(self):
+        """
+        Returns the flat index of the most visited move. At least one
+        iteration runs, however small the budget, so the root always has
+        a child to choose.
+        """
+        game = self.game
+        position = self.position
+        root = game.reuse(position)
+        if root is not None:
+            self.hits = 1
+        else:
+            last = O if position.player == X else X
+            root = game.new_node(None, None, last, position, False)
+
+        deadline = time.perf_counter() + game.time_limit
+        iterations = 0
+        while True:
+            self.iterate(root)
+            iterations += 1
+            if self.progress is not None and iterations % REPORT_EVERY == 0:
+                best = max(root.children.values(),
+                           key=lambda child: child.visits)
+                self.progress(self.depth, best.reward / best.visits,
+                              divmod(best.move, game.cols))
+            if game.playouts is not None:
+                if self.nodes >= game.playouts:
+                    break
+            elif time.perf_counter() > deadline:
+                break
+            if self.stop is not None and self.stop.is_set():
+                break
+
+        game.tree, game.tree_cells = root, list(position.cells)
+        return max(root.children.values(),
+                   key=lambda child: child.visits).move
+
+    def iterate(self, root):
+        """
+        Selects a leaf, expands it and scores it by a batch of playouts.
+        """
+        game = self.game
+        position = self.position
+        made = []
+
+        node = root
+        while not node.untried and node.children:
+            node = node.select()
+            position.make(node.move)
+            made.append(node.move)
+        if node.untried:
+            cell = node.untried.pop()
+            won = position.make(cell)
+            made.append(cell)
+            child = game.new_node(node, cell, position.cells[cell], position,
+                                  won)
+            node.children[cell] = child
+            node = child
+        self.depth = max(self.depth, len(made))
+
+        count = game.batch
+        if node.terminal:
+            wins = {X: 0, O: 0}
+            if node.winner is not None:
+                wins[node.winner] = count
+        else:
+            wins = playouts(game, position, count, game.rng)
+        self.nodes += count
+
+        for cell in reversed(made):
+            position.unmake(cell)
+        draws = count - wins[X] - wins[O]
+        while node is not None:
+            node.visits += 1
+            node.reward += (wins[node.player] + 0.5 * draws) / count
+            node = node.parent
+
+
+def playouts(game, position, count, rng):
+    """
+    Plays `count` uniformly random games to the end from `position`, all at
+    once, and returns a dict of the number won by X and by O.
+    """
+    cells = np.array([1 if piece == X else -1 if piece == O else 0
+                      for piece in position.cells], dtype=np.int8)
+    empties = np.flatnonzero(cells == 0)
+    turns = len(empties)
+    mover = 1 if position.player == X else -1
+
+    # Each game fills the empty cells in its own random order
+    order = empties[np.argsort(rng.random((count, turns)), axis=1)]
+    games = np.arange(count)[:, None]
+    boards = np.tile(cells, (count, 1))
+    boards[games, order] = np.where(np.arange(turns) % 2 == 0, mover,
+                                    -mover).astype(np.int8)
+    times = np.full(boards.shape, -1, dtype=np.int32)
+    times[games, order] = np.arange(turns, dtype=np.int32)
+
+    # A line is won when its last cell is filled; the first line wins
+    lines = boards[:, game.window_array]
+    finished = times[:, game.window_array].max(axis=2)
+    never = turns + 1
+    x_first = np.where((lines == 1).all(axis=2), finished, never).min(axis=1)
+    o_first = np.where((lines == -1).all(axis=2), finished, never).min(axis=1)
+    return {X: int(np.count_nonzero(x_first < o_first)),
+            O: int(np.count_nonzero(o_first < x_first))}
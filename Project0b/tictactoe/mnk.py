@@ -0,0 +1,568 @@
+"""
+m,n,k-game engine
+
+Tic Tac Toe generalised to a `rows` x `cols` board where the first player
+to get `k` in a row (horizontally, vertically or diagonally) wins. A `Game`
+offers the same functions as tictactoe.py, as methods, so it can be used in
+its place. Its `minimax` runs an iterative-deepening alpha-beta search with
+a transposition table and move ordering, and answers within `time_limit`
+seconds using a pluggable heuristic evaluator at the depth limit.
+
+With `processes` above 1, each depth's root moves after the first are
+searched in a pool of worker processes, each with its own transposition
+table, against the alpha found for the first move. At a given depth this
+picks the same move as the serial search. Stopping a search also halts
+the root moves still being searched in the pool.
+
+The search plays and takes back moves in place on a `Position`, which
+keeps per-window piece counts and a Zobrist hash up to date as it goes,
+so no board is copied or rescanned inside the search.
+"""
+
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, wait
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# Score of a won position; wins further away score slightly less
+WIN = 1000000
+WIN_THRESHOLD = WIN - 10000
+
+# Transposition table entry flags
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Transposition table entries kept before the table is cleared
+TABLE_LIMIT = 1 << 20
+
+# Seconds between checks of a split root search's deadline and `stop` while
+# it waits for the worker processes
+STOP_INTERVAL = 0.05
+
+
+class Timeout(Exception):
+    pass
+
+
+class Game():
+    """
+    An m,n,k-game and its search engine.
+    """
+
+    def __init__(self, rows=3, cols=3, k=3, time_limit=1.0,
+                 evaluator=None, processes=1):
+        """
+        `evaluator(position)` scores a non-terminal `Position` from the
+        point of view of the player to move. It defaults to
+        `window_evaluator`, and must be picklable if `processes` is above 1.
+        """
+        if not 1 <= k <= max(rows, cols):
+            raise ValueError("k must fit on the board")
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.time_limit = time_limit
+        self.evaluator = evaluator or window_evaluator
+        self.processes = processes
+        self.pool = None
+
+        # Set to halt the worker processes' searches
+        self.halt = None
+
+        # The Search behind the latest move, for its statistics
+        self.last_search = None
+
+        # Every line of k cells, as flat cell indices
+        self.windows = []
+        for i in range(rows):
+            for j in range(cols):
+                for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                    if 0 <= end_i < rows and 0 <= end_j < cols:
+                        self.windows.append(tuple(
+                            (i + di * n) * cols + j + dj * n
+                            for n in range(k)
+                        ))
+        self.cell_windows = [[] for _ in range(rows * cols)]
+        for number, window in enumerate(self.windows):
+            for cell in window:
+                self.cell_windows[cell].append(number)
+
+        # Zobrist keys of each player's piece on each cell; seeded by the
+        # board size so worker processes agree on them
+        keys = random.Random(f"{rows}x{cols}")
+        self.zobrist = {
+            player: [keys.getrandbits(64) for _ in range(rows * cols)]
+            for player in (X, O)
+        }
+
+        # Cells ordered from the centre out, the default move ordering
+        centre_i, centre_j = (rows - 1) / 2, (cols - 1) / 2
+        self.centre_order = sorted(
+            range(rows * cols),
+            key=lambda cell: (abs(cell // cols - centre_i)
+                              + abs(cell % cols - centre_j))
+        )
+
+        # Search results, kept across moves and games
+        self.transpositions = {}
+        self.history = [0] * (rows * cols)
+
+    def initial_state(self):
+        """
+        Returns starting state of the board.
+        """
+        return [[EMPTY] * self.cols for _ in range(self.rows)]
+
+    def player(self, board):
+        """
+        Returns player who has the next turn on a board.
+        """
+        return to_move(flatten(board))
+
+    def actions(self, board):
+        """
+        Returns set of all possible actions (i, j) available on the board.
+        """
+        return {(i, j) for i in range(self.rows) for j in range(self.cols)
+                if board[i][j] == EMPTY}
+
+    def result(self, board, action):
+        """
+        Returns the board that results from making move (i, j) on the board.
+        """
+        i, j = action
+        if not (0 <= i < self.rows and 0 <= j < self.cols) \
+                or board[i][j] != EMPTY:
+            raise Exception("Invalid Move")
+        new_board = [list(row) for row in board]
+        new_board[i][j] = self.player(board)
+        return new_board
+
+    def winner(self, board):
+        """
+        Returns the winner of the game, if there is one.
+        """
+        cells = flatten(board)
+        for window in self.windows:
+            first = cells[window[0]]
+            if first != EMPTY and all(cells[c] == first for c in window):
+                return first
+        return None
+
+    def terminal(self, board):
+        """
+        Returns True if game is over, False otherwise.
+        """
+        return (self.winner(board) is not None
+                or all(cell != EMPTY for row in board for cell in row))
+
+    def utility(self, board):
+        """
+        Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+        """
+        return {X: 1, O: -1, None: 0}[self.winner(board)]
+
+    def minimax(self, board, stop=None, progress=None):
+        """
+        Returns the best action found for the current player on the board
+        within the time limit.
+
+        Setting the threading.Event `stop` ends the search early with the
+        best action found so far. `progress(depth, score, action)` is
+        called after every completed depth.
+        """
+        if self.terminal(board):
+            return None
+        if len(self.transpositions) > TABLE_LIMIT:
+            self.transpositions.clear()
+        search = Search(self, time.perf_counter() + self.time_limit, stop,
+                        progress)
+        cell = search.best_move(self.position(board))
+        self.last_search = search
+        return divmod(cell, self.cols)
+
+    def position(self, board):
+        """
+        Returns a Position for a list-of-lists board.
+        """
+        return Position(self, flatten(board))
+
+    def executor(self):
+        """
+        Returns the pool searching root moves, started on first use.
+        """
+        if self.pool is None:
+            self.halt = multiprocessing.Event()
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.processes, initializer=start_worker,
+                initargs=(self.rows, self.cols, self.k, self.evaluator,
+                          self.halt)
+            )
+        return self.pool
+
+    def close(self):
+        """
+        Shuts down the worker processes, if any were started.
+        """
+        if self.pool is not None:
+            self.halt.set()
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+
+
+class Position():
+    """
+    A mutable board for search. `make` and `unmake` play and take back a
+    move in place, keeping each player's piece count in every window, the
+    number of completed lines, the empty cell count, the player to move
+    and a Zobrist `key` up to date, so `winner` and `terminal` are O(1).
+    """
+
+    def __init__(self, game, cells):
+        self.game = game
+        self.cells = [EMPTY] * len(cells)
+        self.counts = {X: [0] * len(game.windows),
+                       O: [0] * len(game.windows)}
+        self.lines = {X: 0, O: 0}
+        self.empties = len(cells)
+        self.key = 0
+        self.player = X
+
+        # Replay the pieces, alternating players as the counts allow
+        pieces = {player: [cell for cell, piece in enumerate(cells)
+                           if piece == player] for player in (X, O)}
+        while pieces[self.player]:
+            self.make(pieces[self.player].pop())
+        if pieces[X] or pieces[O]:
+            raise ValueError("Impossible piece counts")
+
+    def make(self, cell):
+        """
+        Plays `cell` for the player to move. Returns True if the move
+        completes a line of k.
+        """
+        player = self.player
+        self.cells[cell] = player
+        self.empties -= 1
+        self.key ^= self.game.zobrist[player][cell]
+        counts = self.counts[player]
+        k = self.game.k
+        won = False
+        for window in self.game.cell_windows[cell]:
+            counts[window] += 1
+            if counts[window] == k:
+                self.lines[player] += 1
+                won = True
+        self.player = O if player == X else X
+        return won
+
+    def unmake(self, cell):
+        """
+        Takes back the move on `cell`, which must be the last one made.
+        """
+        player = self.cells[cell]
+        counts = self.counts[player]
+        k = self.game.k
+        for window in self.game.cell_windows[cell]:
+            if counts[window] == k:
+                self.lines[player] -= 1
+            counts[window] -= 1
+        self.cells[cell] = EMPTY
+        self.empties += 1
+        self.key ^= self.game.zobrist[player][cell]
+        self.player = player
+
+    def winner(self):
+        if self.lines[X]:
+            return X
+        if self.lines[O]:
+            return O
+        return None
+
+    def terminal(self):
+        return not self.empties or self.lines[X] or self.lines[O]
+
+
+class Search():
+    """
+    One iterative-deepening alpha-beta search, stopping at `deadline` or
+    once `stop` is set.
+    """
+
+    def __init__(self, game, deadline, stop=None, progress=None):
+        self.game = game
+        self.deadline = deadline
+        self.stop = stop
+        self.progress = progress
+        self.nodes = 0
+        self.probes = 0
+        self.hits = 0
+        self.depth = 0
+
+    def best_move(self, position):
+        """
+        Returns the flat index of the best move found from `position`.
+        """
+        empties = [cell for cell in self.game.centre_order
+                   if position.cells[cell] == EMPTY]
+        best = empties[0]
+        if len(empties) == 1:
+            return best
+
+        # A forced win or loss found at one depth stays forced at the next
+        for depth in range(1, len(empties) + 1):
+            try:
+                score, move = self.root(position, depth)
+            except Timeout:
+                break
+            best = move
+            self.depth = depth
+            if self.progress is not None:
+                self.progress(depth, score, divmod(move, self.game.cols))
+            if abs(score) >= WIN_THRESHOLD:
+                break
+        return best
+
+    def root(self, position, depth):
+        if self.game.processes > 1 and depth > 1:
+            return self.split_root(position, depth)
+        score = self.negamax(position, depth, -WIN - 1, WIN + 1)
+        _, _, _, move = self.game.transpositions[position.key]
+        return score, move
+
+    def split_root(self, position, depth):
+        """
+        Searches the root to `depth` in parallel: the first move in order
+        is searched here to set alpha, and the others in the worker pool
+        with that alpha. Moves can only beat the first by scoring above
+        alpha, which they report exactly, so the best of them (the first
+        in order on ties) is the serial search's choice.
+        """
+        game = self.game
+        entry = game.transpositions.get(position.key)
+        moves = self.order(position, entry[3] if entry else None)
+
+        alpha = self.score_move(position, moves[0], depth, -WIN - 1)
+        best, best_move = alpha, moves[0]
+        if alpha < WIN_THRESHOLD:
+            # Workers get the deadline as wall clock time, which (unlike
+            # perf_counter) every process reads alike, so moves queued
+            # behind others do not start with a fresh budget
+            deadline = time.time() + self.deadline - time.perf_counter()
+            futures = [
+                game.executor().submit(search_move, position.cells, cell,
+                                       depth, alpha, deadline)
+                for cell in moves[1:]
+            ]
+            try:
+                for cell, future in zip(moves[1:], futures):
+                    outcome = self.wait(future)
+                    if outcome is None:
+                        raise Timeout
+                    score, nodes, probes, hits = outcome
+                    self.nodes += nodes
+                    self.probes += probes
+                    self.hits += hits
+                    if score > best:
+                        best, best_move = score, cell
+            except Timeout:
+                self.cancel(futures)
+                raise
+
+        game.transpositions[position.key] = (depth, best, EXACT, best_move)
+        return best, best_move
+
+    def wait(self, future):
+        """
+        Returns the result of a root move searched in the pool, raising
+        Timeout if the deadline passes or `stop` is set first.
+        """
+        while True:
+            remaining = self.deadline - time.perf_counter()
+            try:
+                return future.result(
+                    timeout=max(0, min(STOP_INTERVAL, remaining)))
+            except TimeoutError:
+                if time.perf_counter() > self.deadline or (
+                        self.stop is not None and self.stop.is_set()):
+                    raise Timeout
+
+    def cancel(self, futures):
+        """
+        Ends the search of every root move in `futures` and waits for the
+        worker processes to stop.
+        """
+        for future in futures:
+            future.cancel()
+        self.game.halt.set()
+        try:
+            wait(futures)
+        finally:
+            self.game.halt.clear()
+
+    def score_move(self, position, cell, depth, alpha):
+        """
+        Returns the score for the player to move of playing `cell`,
+        searched to `depth` with the window (alpha, WIN + 1).
+        """
+        try:
+            if position.make(cell):
+                score = WIN
+            else:
+                score = -self.negamax(position, depth - 1, -WIN - 1, -alpha)
+        finally:
+            position.unmake(cell)
+        if score >= WIN_THRESHOLD:
+            score -= 1
+        elif score <= -WIN_THRESHOLD:
+            score += 1
+        return score
+
+    def negamax(self, position, depth, alpha, beta):
+        """
+        Returns the score of `position` for the player to move, searching
+        `depth` plies. Every move made on `position` is unmade again.
+        """
+        self.nodes += 1
+        if time.perf_counter() > self.deadline or (
+                self.stop is not None and self.stop.is_set()):
+            raise Timeout
+
+        game = self.game
+        key = position.key
+        original_alpha = alpha
+        tt_move = None
+        self.probes += 1
+        entry = game.transpositions.get(key)
+        if entry is not None:
+            self.hits += 1
+            entry_depth, score, flag, tt_move = entry
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return score
+                if flag == LOWER:
+                    alpha = max(alpha, score)
+                elif flag == UPPER:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        if not position.empties:
+            return 0
+        if depth == 0:
+            return game.evaluator(position)
+
+        moves = self.order(position, tt_move)
+        best, best_move = -WIN - 1, moves[0]
+        for cell in moves:
+            if position.make(cell):
+                score = WIN
+            else:
+                score = -self.negamax(position, depth - 1, -beta, -alpha)
+            position.unmake(cell)
+
+            # Prefer quicker wins and slower losses
+            if score >= WIN_THRESHOLD:
+                score -= 1
+            elif score <= -WIN_THRESHOLD:
+                score += 1
+
+            if score > best:
+                best, best_move = score, cell
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                game.history[cell] += depth * depth
+                break
+
+        if best <= original_alpha:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        game.transpositions[key] = (depth, best, flag, best_move)
+        return best
+
+    def order(self, position, first=None):
+        """
+        Returns the empty cells, best candidates first: the transposition
+        table move, then by history score, then from the centre out.
+        """
+        cells = position.cells
+        history = self.game.history
+        moves = [cell for cell in self.game.centre_order
+                 if cells[cell] == EMPTY and cell != first]
+        moves.sort(key=lambda cell: -history[cell])
+        if first is not None and cells[first] == EMPTY:
+            moves.insert(0, first)
+        return moves
+
+
+# The worker process's own game, holding its transposition table
+worker_game = None
+
+# Event set by the main process to halt the worker's search
+worker_halt = None
+
+
+def start_worker(rows, cols, k, evaluator, halt):
+    global worker_game, worker_halt
+    worker_game = Game(rows, cols, k, evaluator=evaluator)
+    worker_halt = halt
+
+
+def search_move(cells, cell, depth, alpha, deadline):
+    """
+    Scores one root move in a worker process, searching until `deadline`
+    (a `time.time()` value) at most.
+
+    Returns (score, nodes, probes, hits), or None if time ran out or the
+    search was halted.
+    """
+    remaining = deadline - time.time()
+    search = Search(worker_game, time.perf_counter() + remaining,
+                    worker_halt)
+    if len(worker_game.transpositions) > TABLE_LIMIT:
+        worker_game.transpositions.clear()
+    try:
+        score = search.score_move(Position(worker_game, cells), cell,
+                                  depth, alpha)
+    except Timeout:
+        return None
+    return score, search.nodes, search.probes, search.hits
+
+
+def window_evaluator(position):
+    """
+    Scores a position for the player to move by its open lines: every
+    window holding pieces of only one player is worth 4 ** pieces to that
+    player.
+    """
+    score = 0
+    for xs, os in zip(position.counts[X], position.counts[O]):
+        if not os and xs:
+            score += 4 ** xs
+        elif not xs and os:
+            score -= 4 ** os
+    return score if position.player == X else -score
+
+
+def flatten(board):
+    """
+    Returns a board as a flat tuple of cells, row by row.
+    """
+    return tuple(cell for row in board for cell in row)
+
+
+def to_move(cells):
+    """
+    Returns the player to move on a flat board.
+    """
+    xs = sum(1 for cell in cells if cell == X)
+    os = sum(1 for cell in cells if cell == O)
+    return X if xs == os else O
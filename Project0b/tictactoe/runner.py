@@ -1,8 +1,43 @@
+import argparse
 import pygame
 import sys
 import time
 
+import mcts
+import mnk
 import tictactoe as ttt
+from worker import MoveWorker
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--rows", type=int, default=3)
+parser.add_argument("--cols", type=int, default=3)
+parser.add_argument("-k", type=int, default=3,
+                    help="pieces in a row needed to win")
+parser.add_argument("--time-limit", type=float, default=1.0,
+                    help="seconds the AI may think per move on larger boards")
+parser.add_argument("--processes", type=int, default=1,
+                    help="worker processes searching root moves on larger boards")
+parser.add_argument("--engine", choices=("book", "alphabeta", "mcts"),
+                    help="default: book for 3x3 Tic Tac Toe, alphabeta otherwise")
+parser.add_argument("--playouts", type=int,
+                    help="mcts playouts per move (default: use the time limit)")
+args = parser.parse_args()
+
+# Plain Tic Tac Toe uses the perfect-play book, anything else a search
+if args.engine is None:
+    args.engine = ("book" if (args.rows, args.cols, args.k) == (3, 3, 3)
+                   else "alphabeta")
+if args.engine == "book":
+    if (args.rows, args.cols, args.k) != (3, 3, 3):
+        sys.exit("The book engine only plays 3x3 Tic Tac Toe.")
+    game = ttt
+elif args.engine == "mcts":
+    game = mcts.Game(args.rows, args.cols, args.k, args.time_limit,
+                     playouts=args.playouts)
+else:
+    game = mnk.Game(args.rows, args.cols, args.k, args.time_limit,
+                    processes=args.processes)
+rows, cols = args.rows, args.cols
 
 pygame.init()
 size = width, height = 600, 400
@@ -15,11 +50,15 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+
+# Shrink the tiles (and their marks) to fit bigger boards on screen
+tile_size = min(80, (height - 100) // rows, (width - 40) // cols)
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
 
 user = None
-board = ttt.initial_state()
-ai_turn = False
+board = game.initial_state()
+worker = MoveWorker(game)
+clock = pygame.time.Clock()
 
 while True:
 
@@ -67,13 +106,12 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (cols / 2 * tile_size),
+                       height / 2 - (rows / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(rows):
             row = []
-            for j in range(3):
+            for j in range(cols):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -89,18 +127,20 @@ while True:
                 row.append(rect)
             tiles.append(row)
 
-        game_over = ttt.terminal(board)
-        player = ttt.player(board)
+        game_over = game.terminal(board)
+        player = game.player(board)
 
         # Show title
         if game_over:
-            winner = ttt.winner(board)
+            winner = game.winner(board)
             if winner is None:
                 title = f"Game Over: Tie."
             else:
                 title = f"Game Over: {winner} wins."
         elif user == player:
             title = f"Play as {user}"
+        elif worker.progress() is not None:
+            title = f"Computer thinking... depth {worker.progress()[0]}"
         else:
             title = f"Computer thinking..."
         title = largeFont.render(title, True, white)
@@ -108,24 +148,23 @@ while True:
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Check for AI move, searched in the background; while the user
+        # is thinking, search the position after their likely reply
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+            move = worker.poll(board)
+            if move is not None:
+                board = game.result(board, move)
+        elif not game_over:
+            worker.ponder(board)
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(rows):
+                for j in range(cols):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
-                        board = ttt.result(board, (i, j))
+                        board = game.result(board, (i, j))
 
         if game_over:
             againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
@@ -140,7 +179,8 @@ while True:
                 if againButton.collidepoint(mouse):
                     time.sleep(0.2)
                     user = None
-                    board = ttt.initial_state()
-                    ai_turn = False
+                    board = game.initial_state()
+                    worker.cancel()
 
     pygame.display.flip()
+    clock.tick(30)
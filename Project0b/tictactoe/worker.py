@@ -0,0 +1,146 @@
+"""
+Background move search for runner.py.
+
+A `MoveWorker` searches in a daemon thread so the pygame loop keeps
+drawing while the AI thinks. Searches can be cancelled, report their
+progress after every completed depth, and can be started speculatively
+while the human is thinking ("pondering") on the position expected after
+the human's most likely reply. If the human plays that reply, the search
+already under way becomes the AI's move.
+
+Cancelling a search never waits for it: the next search's thread does the
+waiting, so searches of the same game never overlap.
+"""
+
+import threading
+
+import mcts
+import mnk
+
+
+class Job():
+    """
+    One search for the move to play on a board, run in its own thread
+    once the thread `after` (if any) has finished.
+    """
+
+    def __init__(self, game, board, after=None):
+        self.key = board_key(board)
+        self.stop = threading.Event()
+        self.done = threading.Event()
+        self.move = None
+        self.progress = None
+
+        # Exception raised by the search, re-raised by MoveWorker.poll
+        self.error = None
+        self.thread = threading.Thread(target=self.run,
+                                       args=(game, board, after),
+                                       daemon=True)
+        self.thread.start()
+
+    def run(self, game, board, after):
+        try:
+            if after is not None:
+                after.join()
+            if self.stop.is_set():
+                return
+            if isinstance(game, (mnk.Game, mcts.Game)):
+                move = game.minimax(board, stop=self.stop,
+                                    progress=self.report)
+            else:
+                move = game.minimax(board)
+            if not self.stop.is_set():
+                self.move = move
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+    def report(self, depth, score, move):
+        self.progress = (depth, score, move)
+
+    def cancel(self):
+        """
+        Stops the search, without waiting for its thread to finish.
+        """
+        self.stop.set()
+
+
+class MoveWorker():
+    """
+    Runs at most one search at a time for `game`, which is the tictactoe
+    module or an mnk.Game.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.job = None
+
+        # Thread of the latest job, which the next job waits for
+        self.thread = None
+
+    def request(self, board):
+        """
+        Makes sure the move for `board` is being searched, keeping a
+        pondering search that guessed this board.
+        """
+        if self.job is None or self.job.key != board_key(board):
+            self.cancel()
+            self.job = Job(self.game, board, self.thread)
+            self.thread = self.job.thread
+
+    def poll(self, board):
+        """
+        Returns the move found for `board`, or None if it is not ready.
+        Raises the exception the search failed with, if any.
+        """
+        self.request(board)
+        if not self.job.done.is_set():
+            return None
+        job, self.job = self.job, None
+        if job.error is not None:
+            raise job.error
+        return job.move
+
+    def ponder(self, board):
+        """
+        While the human is to move on `board`, searches the position after
+        their predicted reply. Does nothing if that is already under way
+        or no reply can be predicted.
+        """
+        reply = self.predict(board)
+        if reply is not None:
+            self.request(self.game.result(board, reply))
+
+    def predict(self, board):
+        """
+        Returns the human's most likely reply on `board`: the best move
+        known to the engine, or None if it has none to hand.
+        """
+        if isinstance(self.game, mnk.Game):
+            entry = self.game.transpositions.get(
+                self.game.position(board).key)
+            if entry is None or board[entry[3] // self.game.cols][
+                    entry[3] % self.game.cols] != mnk.EMPTY:
+                return None
+            return divmod(entry[3], self.game.cols)
+        return self.game.minimax(board)
+
+    def progress(self):
+        """
+        Returns (depth, score, move) of the current search's last completed
+        depth, or None.
+        """
+        return self.job.progress if self.job is not None else None
+
+    def cancel(self):
+        """
+        Abandons the current search, if any.
+        """
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+
+
+def board_key(board):
+    return tuple(tuple(row) for row in board)
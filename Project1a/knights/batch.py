@@ -0,0 +1,56 @@
+"""
+Batch entailment.
+
+`model_check_many` answers any number of queries against one knowledge
+base while enumerating its models only once, and `check_puzzles` does so
+for several knowledge bases at a time across worker processes.
+"""
+
+import os
+from multiprocessing import Pool
+
+import numpy as np
+
+from compiled import BLOCK_MODELS, Program, all_models
+
+
+def model_check_many(knowledge, queries, stats=None):
+    """
+    Checks which queries the knowledge base entails. If given,
+    `stats["models"]` is increased by the number of models checked.
+
+    Returns (entailed, symbols, models): a list with a bool for each query,
+    the names of all symbols used, and a boolean array holding every model
+    consistent with the knowledge base, one row per model and one column
+    per symbol.
+    """
+    queries = list(queries)
+    program = Program([knowledge] + queries)
+    count = len(program.symbols)
+    refuted = np.zeros(len(queries), dtype=bool)
+    consistent = []
+    for start in range(0, 1 << count, BLOCK_MODELS):
+        stop = min(start + BLOCK_MODELS, 1 << count)
+        if stats is not None:
+            stats["models"] = stats.get("models", 0) + stop - start
+        models = all_models(count, start, stop)
+        holds, *answers = program.vectorized(models)
+        for number, answer in enumerate(answers):
+            if not refuted[number]:
+                refuted[number] = np.any(holds & ~answer)
+        consistent.append(models[:, holds].T)
+    models = np.concatenate(consistent)
+    return [not refutation for refutation in refuted], program.symbols, models
+
+
+def check_puzzles(puzzles, queries, processes=None):
+    """
+    Runs `model_check_many` for the same queries against each knowledge
+    base in `puzzles`, in a pool of `processes` worker processes (one per
+    CPU by default). Returns the results in the order of `puzzles`.
+    """
+    tasks = [(knowledge, queries) for knowledge in puzzles]
+    if processes == 1 or len(tasks) <= 1:
+        return [model_check_many(*task) for task in tasks]
+    with Pool(min(processes or os.cpu_count(), len(tasks))) as pool:
+        return pool.starmap(model_check_many, tasks)
@@ -0,0 +1,183 @@
+"""
+Benchmark of the entailment engines on generated knights and knaves
+puzzles.
+
+Each puzzle has N inhabitants, each of whom is exactly one of a knight or
+a knave, and each of whom makes one random statement about the others.
+Statements are chosen to be consistent with a hidden assignment, so every
+puzzle has at least one solution. For each N, every strategy is asked
+whether the puzzle entails "i is a Knight" for every inhabitant i, and its
+wall time, peak traced memory and number of models visited are reported
+(for the SAT strategy, the number of branching decisions instead). Memory
+is traced in a second run, so tracing does not slow the timed one.
+
+Usage: python benchmark.py [--sizes N [N ...]] [--strategies ...]
+                           [--seed SEED] [--json FILE]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from batch import model_check_many
+from compiled import compiled_model_check, vector_model_check
+from logic import And, Biconditional, Not, Or, Symbol, model_check
+from sat import Solver
+
+# Largest number of symbols each strategy is run on, if limited
+SYMBOL_LIMITS = {
+    "enumeration": 14,
+    "compiled": 18,
+    "vectorized": 22,
+    "batch": 24,
+    "sat": None
+}
+
+
+def generate(size, rng):
+    """
+    Returns (knowledge, queries) for a random puzzle of `size` inhabitants.
+    """
+    knights = [Symbol(f"{i} is a Knight") for i in range(size)]
+    knaves = [Symbol(f"{i} is a Knave") for i in range(size)]
+    hidden = {}
+    for knight, knave in zip(knights, knaves):
+        hidden[knight.name] = rng.random() < 0.5
+        hidden[knave.name] = not hidden[knight.name]
+
+    knowledge = And()
+    for knight, knave in zip(knights, knaves):
+        knowledge.add(Or(knight, knave))
+        knowledge.add(Not(And(knight, knave)))
+
+    for speaker in range(size):
+        statement = random_statement(speaker, knights, knaves, rng)
+        if statement.evaluate(hidden) != hidden[knights[speaker].name]:
+            statement = Not(statement)
+
+        # Knights tell the truth and knaves lie
+        knowledge.add(Biconditional(knights[speaker], statement))
+    return knowledge, knights
+
+
+def random_statement(speaker, knights, knaves, rng):
+    """
+    Returns a random statement by `speaker` about some inhabitants.
+    """
+    a, b = rng.randrange(len(knights)), rng.randrange(len(knights))
+    kind = rng.randrange(5)
+    if kind == 0:
+        return knights[a]
+    if kind == 1:
+        return knaves[a]
+    if kind == 2:
+        # "We are the same kind."
+        return Biconditional(knights[speaker], knights[a])
+    if kind == 3:
+        return And(knaves[a], knaves[b])
+    return Or(knights[a], knights[b])
+
+
+def run(strategy, knowledge, queries):
+    """
+    Answers every query with `strategy`.
+
+    Returns (answers, models visited).
+    """
+    stats = {}
+    if strategy == "enumeration":
+        answers = [model_check(knowledge, query, stats) for query in queries]
+    elif strategy == "compiled":
+        answers = [compiled_model_check(knowledge, query, stats)
+                   for query in queries]
+    elif strategy == "vectorized":
+        answers = [vector_model_check(knowledge, query, stats)
+                   for query in queries]
+    elif strategy == "batch":
+        answers, _, _ = model_check_many(knowledge, queries, stats)
+    else:
+        solver = Solver(knowledge)
+        answers = [solver.entails(query) for query in queries]
+        stats["models"] = solver.decisions
+    return answers, stats.get("models", 0)
+
+
+def measure(strategy, knowledge, queries):
+    """
+    Returns (answers, result dict) for one strategy on one puzzle.
+    """
+    start = time.perf_counter()
+    answers, visited = run(strategy, knowledge, queries)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        run(strategy, knowledge, queries)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return answers, {
+        "strategy": strategy,
+        "seconds": seconds,
+        "peak_bytes": peak,
+        "models_visited": visited,
+        "entailed": sum(answers)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark entailment strategies on generated puzzles."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[2, 4, 6, 8, 10, 12, 25, 50, 100],
+                        help="numbers of inhabitants")
+    parser.add_argument("--strategies", nargs="+", choices=SYMBOL_LIMITS,
+                        default=list(SYMBOL_LIMITS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="FILE",
+                        help="also write the results as JSON to FILE "
+                             "(- for stdout)")
+    args = parser.parse_args()
+
+    # The table goes to stderr when the JSON goes to stdout
+    table = sys.stderr if args.json == "-" else sys.stdout
+    rng = random.Random(args.seed)
+    results = []
+    print(f"{'N':>4} {'strategy':<12} {'seconds':>10} {'peak KiB':>10} "
+          f"{'visited':>12}", file=table)
+    for size in args.sizes:
+        knowledge, queries = generate(size, rng)
+        symbols = 2 * size
+        expected = None
+        for strategy in args.strategies:
+            limit = SYMBOL_LIMITS[strategy]
+            if limit is not None and symbols > limit:
+                continue
+            answers, result = measure(strategy, knowledge, queries)
+            result["inhabitants"] = size
+            result["symbols"] = symbols
+            if expected is None:
+                expected = answers
+            elif answers != expected:
+                result["mismatch"] = True
+                print(f"Strategies disagree on N={size}: {strategy}",
+                      file=sys.stderr)
+            results.append(result)
+            print(f"{size:>4} {strategy:<12} {result['seconds']:>10.4f} "
+                  f"{result['peak_bytes'] / 1024:>10,.0f} "
+                  f"{result['models_visited']:>12,}", file=table)
+
+    if args.json == "-":
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Compiled evaluation of logical sentences.
+
+`Program` flattens a sentence into a sequence of instructions over
+numbered slots: the first slots hold the symbols, in a fixed order, and
+each instruction combines earlier slots into a new one. Identical
+subformulas share a slot, so each is computed once. A program can be
+turned into a plain Python function of one model (a sequence of truth
+values), or run on NumPy boolean arrays to evaluate many models at once.
+"""
+
+import itertools
+
+import numpy as np
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Models evaluated per NumPy pass
+BLOCK_MODELS = 1 << 20
+
+
+class Program():
+
+    def __init__(self, sentences, symbols=None):
+        """
+        Compiles `sentences` over `symbols` (symbol names, by default every
+        name used in the sentences, sorted).
+        """
+        if symbols is None:
+            symbols = sorted(set().union(
+                *[sentence.symbols() for sentence in sentences]
+            ))
+        self.symbols = list(symbols)
+        self.slots = {name: slot for slot, name in enumerate(self.symbols)}
+        self.instructions = []
+        self.outputs = [self.slot(sentence) for sentence in sentences]
+
+    def slot(self, sentence):
+        """Returns the slot holding `sentence`, adding its instructions."""
+        key = sentence.name if isinstance(sentence, Symbol) else sentence
+        if key in self.slots:
+            return self.slots[key]
+        if isinstance(sentence, Symbol):
+            raise KeyError(f"variable {sentence.name} not in model")
+        if isinstance(sentence, Not):
+            instruction = ("not", self.slot(sentence.operand))
+        elif isinstance(sentence, And):
+            instruction = ("and",) + tuple(
+                self.slot(conjunct) for conjunct in sentence.conjuncts
+            )
+        elif isinstance(sentence, Or):
+            instruction = ("or",) + tuple(
+                self.slot(disjunct) for disjunct in sentence.disjuncts
+            )
+        elif isinstance(sentence, Implication):
+            instruction = ("implies", self.slot(sentence.antecedent),
+                           self.slot(sentence.consequent))
+        elif isinstance(sentence, Biconditional):
+            instruction = ("iff", self.slot(sentence.left),
+                           self.slot(sentence.right))
+        else:
+            raise TypeError("must be a logical sentence")
+        slot = len(self.symbols) + len(self.instructions)
+        self.instructions.append(instruction)
+        self.slots[key] = slot
+        return slot
+
+    def source(self):
+        """Returns the Python source of the compiled function."""
+        lines = ["def evaluate(model):"]
+        if self.symbols:
+            names = ", ".join(f"s{slot}" for slot in range(len(self.symbols)))
+            lines.append(f"    {names}, = model")
+        for number, (op, *args) in enumerate(self.instructions):
+            slot = len(self.symbols) + number
+            args = [f"s{arg}" for arg in args]
+            if op == "not":
+                expression = f"not {args[0]}"
+            elif op == "and":
+                expression = " and ".join(args) or "True"
+            elif op == "or":
+                expression = " or ".join(args) or "False"
+            elif op == "implies":
+                expression = f"not {args[0]} or {args[1]}"
+            else:
+                expression = f"{args[0]} == {args[1]}"
+            lines.append(f"    s{slot} = {expression}")
+        outputs = ", ".join(f"s{slot}" for slot in self.outputs)
+        lines.append(f"    return {outputs},")
+        return "\n".join(lines)
+
+    def function(self):
+        """
+        Returns a function mapping a model, a sequence of truth values in
+        the order of `self.symbols`, to a tuple with the truth value of
+        each compiled sentence.
+        """
+        namespace = {}
+        exec(self.source(), namespace)
+        return namespace["evaluate"]
+
+    def vectorized(self, models):
+        """
+        Evaluates the program on a 2D boolean array with one row per symbol
+        and one column per model (see `all_models`). Returns a list holding
+        a boolean array for each compiled sentence.
+        """
+        count = models.shape[1]
+
+        # Free every slot after its last use
+        last_use = {}
+        for number, (_, *args) in enumerate(self.instructions):
+            for arg in args:
+                last_use[arg] = number
+        for slot in self.outputs:
+            last_use[slot] = len(self.instructions)
+
+        values = {slot: models[slot] for slot in range(len(self.symbols))}
+        for number, (op, *args) in enumerate(self.instructions):
+            operands = [values[arg] for arg in args]
+            if op == "not":
+                value = ~operands[0]
+            elif op == "and":
+                value = np.ones(count, dtype=bool)
+                for operand in operands:
+                    value &= operand
+            elif op == "or":
+                value = np.zeros(count, dtype=bool)
+                for operand in operands:
+                    value |= operand
+            elif op == "implies":
+                value = ~operands[0] | operands[1]
+            else:
+                value = operands[0] == operands[1]
+            values[len(self.symbols) + number] = value
+            for arg in set(args):
+                if last_use[arg] == number:
+                    del values[arg]
+        return [values[slot] for slot in self.outputs]
+
+
+def all_models(count, start=0, stop=None):
+    """
+    Returns the models numbered `start` to `stop` (by default all 2 **
+    count of them) of `count` symbols, as a boolean array with one row per
+    symbol and one column per model. Bit i of a model's number is the value
+    of symbol i.
+    """
+    if stop is None:
+        stop = 1 << count
+    numbers = np.arange(start, stop, dtype=np.int64)
+    models = np.empty((count, len(numbers)), dtype=bool)
+    for symbol in range(count):
+        np.not_equal(numbers >> symbol & 1, 0, out=models[symbol])
+    return models
+
+
+def compiled_model_check(knowledge, query, stats=None):
+    """
+    Checks if knowledge base entails query, enumerating models one at a
+    time through a compiled function. `stats` is as for model_check.
+    """
+    program = Program([knowledge, query])
+    evaluate = program.function()
+    checked = 0
+    try:
+        for model in itertools.product((True, False),
+                                       repeat=len(program.symbols)):
+            checked += 1
+            holds, entailed = evaluate(model)
+            if holds and not entailed:
+                return False
+        return True
+    finally:
+        if stats is not None:
+            stats["models"] = stats.get("models", 0) + checked
+
+
+def vector_model_check(knowledge, query, stats=None):
+    """
+    Checks if knowledge base entails query, evaluating blocks of models
+    at once as NumPy arrays. `stats` is as for model_check.
+    """
+    program = Program([knowledge, query])
+    count = len(program.symbols)
+    for start in range(0, 1 << count, BLOCK_MODELS):
+        stop = min(start + BLOCK_MODELS, 1 << count)
+        if stats is not None:
+            stats["models"] = stats.get("models", 0) + stop - start
+        holds, entailed = program.vectorized(all_models(count, start, stop))
+        if np.any(holds & ~entailed):
+            return False
+    return True
@@ -1,7 +1,77 @@
 import itertools
+import weakref
+
+# Every shared sentence by its structure, so that structurally equal
+# sentences are one object. Entries go away with the last reference to a
+# sentence.
+interned = weakref.WeakValueDictionary()
 
 
 class Sentence():
+    """
+    Sentences are hash-consed: building a sentence equal to an existing one
+    returns the existing object. A conjunction can grow with `And.add`, so
+    conjunctions, and sentences containing one, are never shared; only
+    shared sentences, which cannot change, compute their hash once and
+    cache their symbol set and formula.
+    """
+
+    __slots__ = ("_shared", "_hash", "_symbols", "_formula", "__weakref__")
+
+    @classmethod
+    def create(cls, *arguments):
+        """Builds a new, unshared sentence."""
+        sentence = object.__new__(cls)
+        sentence.setup(*arguments)
+        sentence._shared = False
+        sentence._hash = None
+        sentence._symbols = None
+        sentence._formula = None
+        return sentence
+
+    @classmethod
+    def intern(cls, *arguments):
+        """
+        Returns the shared sentence built from `arguments`, or a new
+        unshared one if any argument is an unshared sentence.
+        """
+        if any(isinstance(argument, Sentence) and not argument._shared
+               for argument in arguments):
+            return cls.create(*arguments)
+        key = (cls,) + arguments
+        sentence = interned.get(key)
+        if sentence is None:
+            sentence = cls.create(*arguments)
+            sentence._shared = True
+            sentence._hash = hash(key)
+            interned[key] = sentence
+        return sentence
+
+    def setup(self, *arguments):
+        pass
+
+    def arguments(self):
+        """Returns the arguments the sentence was built from."""
+        return ()
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if type(self) is not type(other):
+            return False
+
+        # Equal shared sentences are the same object
+        if self._shared and other._shared:
+            return False
+        return self.arguments() == other.arguments()
+
+    def __hash__(self):
+        if self._shared:
+            return self._hash
+        return hash((type(self),) + self.arguments())
+
+    def __reduce__(self):
+        return type(self), self.arguments()
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -9,11 +79,34 @@ class Sentence():
 
     def formula(self):
         """Returns string formula representing logical sentence."""
+        if self._formula is not None:
+            return self._formula
+        formula = self.format()
+        if self._shared:
+            self._formula = formula
+        return formula
+
+    def format(self):
+        """Builds the formula returned (and, if shared, cached) by formula."""
         return ""
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(self.symbol_set())
+
+    def symbol_set(self):
+        """
+        Returns the frozenset of all symbols in the sentence, cached if the
+        sentence is shared.
+        """
+        if self._symbols is not None:
+            return self._symbols
+        symbols = frozenset().union(*[
+            argument.symbol_set() for argument in self.arguments()
+        ])
+        if self._shared:
+            self._symbols = symbols
+        return symbols
 
     @classmethod
     def validate(cls, sentence):
@@ -43,15 +136,16 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
+
+    def __new__(cls, name):
+        return cls.intern(name)
 
-    def __init__(self, name):
+    def setup(self, name):
         self.name = name
 
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
-
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def arguments(self):
+        return (self.name,)
 
     def __repr__(self):
         return self.name
@@ -65,20 +159,24 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def symbol_set(self):
+        if self._symbols is None:
+            self._symbols = frozenset([self.name])
+        return self._symbols
 
 
 class Not(Sentence):
-    def __init__(self, operand):
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
         Sentence.validate(operand)
-        self.operand = operand
+        return cls.intern(operand)
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    def setup(self, operand):
+        self.operand = operand
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def arguments(self):
+        return (self.operand,)
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,26 +184,42 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
-    def formula(self):
+    def format(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
-
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    """
+    A conjunction. Conjunctions can grow with `add`, so each one built is
+    a separate object, as are the sentences containing it:
+
+    >>> A, B, C = Symbol("A"), Symbol("B"), Symbol("C")
+    >>> kb1, kb2 = And(A, Not(B)), And(A, Not(B))
+    >>> kb1 == kb2 and kb1 is not kb2
+    True
+    >>> kb2.add(C)
+    >>> kb1.formula(), model_check(kb1, C), model_check(kb2, C)
+    ('A ∧ (¬B)', False, True)
+    >>> wrapped = Not(kb1)
+    >>> wrapped is Not(And(A, Not(B))), wrapped.formula()
+    (False, '¬(A ∧ (¬B))')
+    >>> kb1.add(C)
+    >>> wrapped.formula()
+    '¬(A ∧ (¬B) ∧ C)'
+    """
+
+    __slots__ = ("conjuncts",)
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
+        return cls.create(*conjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+    def setup(self, *conjuncts):
+        self.conjuncts = list(conjuncts)
 
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+    def arguments(self):
+        return tuple(self.conjuncts)
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -120,29 +234,28 @@ class And(Sentence):
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
-    def formula(self):
+    def format(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
-        return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
-                           for conjunct in self.conjuncts])
-
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        return " ∧ ".join(
+            [Sentence.parenthesize(conjunct.formula())
+             for conjunct in self.conjuncts]
+        )
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
+        return cls.intern(*disjuncts)
+
+    def setup(self, *disjuncts):
         self.disjuncts = list(disjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+    def arguments(self):
+        return tuple(self.disjuncts)
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -151,30 +264,29 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
-    def formula(self):
+    def format(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
-        return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
-                            for disjunct in self.disjuncts])
-
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        return " ∨  ".join(
+            [Sentence.parenthesize(disjunct.formula())
+             for disjunct in self.disjuncts]
+        )
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
+        return cls.intern(antecedent, consequent)
+
+    def setup(self, antecedent, consequent):
         self.antecedent = antecedent
         self.consequent = consequent
 
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
-
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def arguments(self):
+        return (self.antecedent, self.consequent)
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,56 +295,52 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
-    def formula(self):
+    def format(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
-
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
+        return cls.intern(left, right)
+
+    def setup(self, left, right):
         self.left = left
         self.right = right
 
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    def arguments(self):
+        return (self.left, self.right)
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
     def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+        return self.left.evaluate(model) == self.right.evaluate(model)
 
-    def formula(self):
+    def format(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+def model_check(knowledge, query, stats=None):
+    """
+    Checks if knowledge base entails query. If given, `stats["models"]`
+    is increased by the number of models checked.
+    """
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
 
         # If model has an assignment for each symbol
         if not symbols:
+            if stats is not None:
+                stats["models"] = stats.get("models", 0) + 1
 
             # If knowledge base is true in model, then query must also be true
             if knowledge.evaluate(model):
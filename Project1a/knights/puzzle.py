@@ -1,4 +1,5 @@
 from logic import *
+from batch import check_puzzles
 
 AKnight = Symbol("A is a Knight")
 AKnave = Symbol("A is a Knave")
@@ -87,13 +88,14 @@ def main():
         ("Puzzle 2", knowledge2),
         ("Puzzle 3", knowledge3)
     ]
-    for puzzle, knowledge in puzzles:
+    results = check_puzzles([knowledge for _, knowledge in puzzles], symbols)
+    for (puzzle, knowledge), (entailed, _, _) in zip(puzzles, results):
         print(puzzle)
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
-            for symbol in symbols:
-                if model_check(knowledge, symbol):
+            for symbol, answer in zip(symbols, entailed):
+                if answer:
                     print(f"    {symbol}")
 
 
@@ -0,0 +1,377 @@
+"""
+Entailment by satisfiability.
+
+A `Solver` converts a knowledge base to conjunctive normal form once,
+using the Tseitin transformation (every compound subformula gets a fresh
+variable defined by a few clauses, so the CNF stays linear in the size of
+the sentence). A query is then answered by checking that the knowledge
+base together with the query's negation is unsatisfiable, with a
+conflict-driven search: unit propagation over two watched literals per
+clause, and on every conflict a learned clause that rules out its cause
+and a backjump to the latest decision it depends on.
+
+Queries only add definitions of fresh variables to the clause set, and
+are negated through an assumption rather than a clause, so one solver
+answers any number of queries against the same knowledge. What unit
+propagation alone derives from the knowledge, and every learned clause,
+is kept between queries.
+"""
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+
+class Solver():
+
+    def __init__(self, knowledge=None):
+        self.variables = {}
+        self.names = [None]
+        self.literals = {}
+        self.clauses = []
+        self.units = []
+        self.watches = {}
+        self.contradiction = False
+        self.occurrences = [0]
+
+        # Clauses added by sentences, and clauses learned from conflicts,
+        # which follow from them and are kept for later searches
+        self.defined = 0
+        self.learned = 0
+
+        # Branching decisions made by all searches so far
+        self.decisions = 0
+
+        # Assignment forced by the clauses alone, and the branching order,
+        # for the clause set of the given size
+        self.root = None
+        if knowledge is not None:
+            self.add(knowledge)
+
+    def add(self, sentence):
+        """Adds a sentence to the knowledge base."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clause([self.literal(disjunct)
+                         for disjunct in sentence.disjuncts])
+        elif isinstance(sentence, Implication):
+            self.clause([-self.literal(sentence.antecedent),
+                         self.literal(sentence.consequent)])
+        else:
+            self.clause([self.literal(sentence)])
+
+    def entails(self, query):
+        """Checks if the knowledge base entails query."""
+        return not self.satisfiable([-self.literal(query)])
+
+    def satisfiable(self, assumptions=()):
+        """
+        Checks if the knowledge base is satisfiable with every literal in
+        `assumptions` true. If so, the satisfying assignment is left in
+        `self.model`, mapping symbol names to truth values.
+        """
+        search = Search(self)
+        if not search.solve(assumptions):
+            return False
+        self.model = {
+            name: search.value[variable] > 0
+            for variable, name in enumerate(self.names)
+            if name is not None
+        }
+        return True
+
+    def variable(self, name=None):
+        """Returns a new variable, named after a symbol if given."""
+        variable = len(self.names)
+        self.names.append(name)
+        self.occurrences.append(0)
+        return variable
+
+    def literal(self, sentence):
+        """
+        Returns a literal equivalent to `sentence`, adding the clauses that
+        define it the first time a subformula is seen.
+        """
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.variables:
+                self.variables[sentence.name] = self.variable(sentence.name)
+            return self.variables[sentence.name]
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.literals:
+            return self.literals[sentence]
+
+        if isinstance(sentence, And):
+            parts = [self.literal(part) for part in sentence.conjuncts]
+            v = self.variable()
+            for part in parts:
+                self.clause([-v, part])
+            self.clause([v] + [-part for part in parts])
+        elif isinstance(sentence, Or):
+            parts = [self.literal(part) for part in sentence.disjuncts]
+            v = self.variable()
+            for part in parts:
+                self.clause([v, -part])
+            self.clause([-v] + parts)
+        elif isinstance(sentence, Implication):
+            a = self.literal(sentence.antecedent)
+            b = self.literal(sentence.consequent)
+            v = self.variable()
+            self.clause([-v, -a, b])
+            self.clause([v, a])
+            self.clause([v, -b])
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            v = self.variable()
+            self.clause([-v, -a, b])
+            self.clause([-v, a, -b])
+            self.clause([v, a, b])
+            self.clause([v, -a, -b])
+        else:
+            raise TypeError("must be a logical sentence")
+        self.literals[sentence] = v
+        return v
+
+    def clause(self, literals):
+        """Adds a clause, dropping duplicate literals and tautologies."""
+        literals = list(dict.fromkeys(literals))
+        if any(-literal in literals for literal in literals):
+            return
+        for literal in literals:
+            self.occurrences[abs(literal)] += 1
+        if not literals:
+            self.contradiction = True
+        elif len(literals) == 1:
+            self.units.append(literals[0])
+        else:
+            index = len(self.clauses)
+            self.clauses.append(literals)
+            self.watches.setdefault(literals[0], []).append(index)
+            self.watches.setdefault(literals[1], []).append(index)
+            self.defined += 1
+
+
+class Search():
+    """
+    One search over a solver's clauses, learning a clause from every
+    conflict. The first two literals of each clause are its watched
+    literals; a clause is only looked at when one of them becomes false.
+    """
+
+    def __init__(self, solver):
+        self.solver = solver
+        self.value = [0] * len(solver.names)
+        self.level = [0] * len(solver.names)
+        self.reason = [None] * len(solver.names)
+        self.trail = []
+        self.head = 0
+
+        # Trail position where each decision level starts
+        self.levels = []
+
+    def solve(self, assumptions):
+        order = self.start()
+        if order is None:
+            return False
+
+        # Each assumption is decided on a level of its own, so learned
+        # clauses never depend on them and stay valid for later searches
+        assumptions = list(assumptions)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.levels:
+                    return False
+                learned, level = self.analyze(conflict)
+                self.backjump(level)
+                self.learn(learned)
+                continue
+
+            if len(self.levels) < len(assumptions):
+                literal = assumptions[len(self.levels)]
+                if self.false(literal):
+                    return False
+                self.levels.append(len(self.trail))
+                if not self.value[abs(literal)]:
+                    self.assign(literal)
+                continue
+
+            variable = next((v for v in order if not self.value[v]), None)
+            if variable is None:
+                return True
+            self.solver.decisions += 1
+            self.levels.append(len(self.trail))
+            self.assign(variable)
+
+    def start(self):
+        """
+        Assigns what the clauses imply on their own, reusing the previous
+        search's work if no clauses were added since. Returns the order to
+        branch on variables in, or None if the clauses are unsatisfiable.
+        """
+        solver = self.solver
+        if solver.contradiction:
+            return None
+        size = (solver.defined, len(solver.units))
+        if solver.root is None or solver.root[0] != size:
+            consistent = True
+            for literal in solver.units:
+                if self.false(literal):
+                    consistent = False
+                elif not self.value[abs(literal)]:
+                    self.assign(literal)
+            if consistent and self.propagate() is None:
+                # Branch on the most frequent variables first
+                order = sorted(range(1, len(solver.names)),
+                               key=lambda v: -solver.occurrences[v])
+                solver.root = (size, list(self.value), list(self.trail),
+                               order)
+            else:
+                solver.root = (size, None, None, None)
+            return solver.root[3]
+
+        _, value, trail, order = solver.root
+        if value is None:
+            return None
+
+        # Variables of queries seen since appear in no clause
+        self.value = value + [0] * (len(solver.names) - len(value))
+        self.trail = list(trail)
+        self.head = len(trail)
+        return order + list(range(len(value), len(solver.names)))
+
+    def false(self, literal):
+        """Checks if `literal` is assigned false."""
+        return self.value[abs(literal)] == (-1 if literal > 0 else 1)
+
+    def assign(self, literal, reason=None):
+        """
+        Makes unassigned `literal` true, implied by the clause numbered
+        `reason` or else decided.
+        """
+        variable = abs(literal)
+        self.value[variable] = 1 if literal > 0 else -1
+        self.level[variable] = len(self.levels)
+        self.reason[variable] = reason
+        self.trail.append(literal)
+
+    def backjump(self, level):
+        """Undoes every assignment made above decision level `level`."""
+        position = self.levels[level]
+        for literal in self.trail[position:]:
+            self.value[abs(literal)] = 0
+        del self.trail[position:]
+        del self.levels[level:]
+        self.head = position
+
+    def analyze(self, conflict):
+        """
+        Resolves the conflicting clause numbered `conflict` with the reasons
+        of its literals until one literal of the current decision level is
+        left (the first unique implication point).
+
+        Returns (learned clause, level to backjump to). The first literal of
+        the clause is the one it will imply after the backjump; literals
+        assigned at level 0 are false in every search and are left out.
+        """
+        clauses = self.solver.clauses
+        current = len(self.levels)
+        seen = set()
+        learned = [None]
+        pending = 0
+        position = len(self.trail)
+        literals = clauses[conflict]
+        while True:
+            for literal in literals:
+                variable = abs(literal)
+                if variable in seen or not self.level[variable]:
+                    continue
+                seen.add(variable)
+                if self.level[variable] == current:
+                    pending += 1
+                else:
+                    learned.append(literal)
+
+            # Resolve on the latest assigned literal still pending
+            position -= 1
+            while abs(self.trail[position]) not in seen:
+                position -= 1
+            implied = self.trail[position]
+            pending -= 1
+            if not pending:
+                break
+            # The implied literal is first in its reason clause
+            literals = clauses[self.reason[abs(implied)]][1:]
+
+        learned[0] = -implied
+        level = 0
+        if len(learned) > 1:
+            latest = max(range(1, len(learned)),
+                         key=lambda n: self.level[abs(learned[n])])
+            learned[1], learned[latest] = learned[latest], learned[1]
+            level = self.level[abs(learned[1])]
+        return learned, level
+
+    def learn(self, learned):
+        """
+        Adds a clause learned by `analyze` after backjumping, and assigns
+        the literal it implies.
+        """
+        solver = self.solver
+        if len(learned) == 1:
+            # Holds in every search from now on
+            solver.units.append(learned[0])
+            self.assign(learned[0])
+            return
+        index = len(solver.clauses)
+        solver.clauses.append(learned)
+        solver.watches.setdefault(learned[0], []).append(index)
+        solver.watches.setdefault(learned[1], []).append(index)
+        solver.learned += 1
+        self.assign(learned[0], index)
+
+    def propagate(self):
+        """
+        Assigns every literal implied by unit clauses. Returns the number
+        of a clause made false, or None if there is no conflict.
+        """
+        value = self.value
+        clauses = self.solver.clauses
+        watches = self.solver.watches
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watching = watches.get(false, [])
+            kept = []
+            for n, index in enumerate(watching):
+                clause = clauses[index]
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                other = clause[0]
+                current = value[abs(other)]
+                if current == (1 if other > 0 else -1):
+                    kept.append(index)
+                    continue
+
+                # Watch another literal that is not false, if any
+                for k in range(2, len(clause)):
+                    literal = clause[k]
+                    if value[abs(literal)] != (-1 if literal > 0 else 1):
+                        clause[1], clause[k] = literal, false
+                        watches.setdefault(literal, []).append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if current:
+                        kept.extend(watching[n + 1:])
+                        watches[false] = kept
+                        return index
+                    self.assign(other, index)
+            watches[false] = kept
+        return None
+
+
+def entails(knowledge, query):
+    """Checks if knowledge base entails query."""
+    return Solver(knowledge).entails(query)
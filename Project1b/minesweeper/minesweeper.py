@@ -157,35 +157,82 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Cells known to be safe that have not been clicked on yet
+        self.safe_moves = set()
+
+        # Sentences about the game known to be true, by their set of cells
+        self.knowledge = {}
+
+        # Sets of cells of the sentences each cell appears in
+        self.index = {}
+
+        # Sentences added or changed since inference last looked at them
+        self.pending = set()
 
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
+        if cell in self.mines:
+            return
         self.mines.add(cell)
-        for sentence in self.knowledge:
+        for cells in list(self.index.get(cell, ())):
+            sentence = self.remove_sentence(cells)
             sentence.mark_mine(cell)
+            self.add_sentence(sentence)
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
+        if cell in self.safes:
+            return
         self.safes.add(cell)
-        for sentence in self.knowledge:
+        if cell not in self.moves_made:
+            self.safe_moves.add(cell)
+        for cells in list(self.index.get(cell, ())):
+            sentence = self.remove_sentence(cells)
             sentence.mark_safe(cell)
-    
-    def neighbours(self,cell):
-        neighbours=set()
-        for i in range(cell[0]-1,cell[0]+2):
-            for j in range(cell[1]-1,cell[1]+2):
-                if 0<=i<self.width and 0<=j<self.height:
-                    if (i,j) not in self.moves_made:
-                        if (i,j) not in self.safes:
-                            neighbours.add((i,j))
+            self.add_sentence(sentence)
+
+    def add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base, unless it is empty or
+        a sentence about the same cells is already known.
+        """
+        cells = frozenset(sentence.cells)
+        if not cells or cells in self.knowledge:
+            return
+        self.knowledge[cells] = sentence
+        for cell in cells:
+            self.index.setdefault(cell, set()).add(cells)
+        self.pending.add(cells)
+
+    def remove_sentence(self, cells):
+        """
+        Removes the sentence about `cells` from the knowledge base,
+        and returns it.
+        """
+        sentence = self.knowledge.pop(cells)
+        for cell in cells:
+            self.index[cell].discard(cells)
+            if not self.index[cell]:
+                del self.index[cell]
+        return sentence
+
+    def neighbours(self, cell):
+        """
+        Returns the cells within one row and column of a given cell,
+        not including the cell itself.
+        """
+        neighbours = set()
+        for i in range(cell[0] - 1, cell[0] + 2):
+            for j in range(cell[1] - 1, cell[1] + 2):
+                if (i, j) != cell and 0 <= i < self.height \
+                        and 0 <= j < self.width:
+                    neighbours.add((i, j))
         return neighbours
 
     def add_knowledge(self, cell, count):
@@ -204,36 +251,64 @@ class MinesweeperAI():
                if they can be inferred from existing knowledge
         """
         self.moves_made.add(cell)
+        self.safe_moves.discard(cell)
         self.mark_safe(cell)
-        neighbours=self.neighbours(cell)
-        mines=set()
-        for neighbour in neighbours:
+
+        # Leave out the neighbours already known to be mines or safe
+        cells = set()
+        for neighbour in self.neighbours(cell):
             if neighbour in self.mines:
-                count-=1
-                mines.add(neighbour)
-        neighbours-=mines
-        self.knowledge.append(Sentence(neighbours,count))
-
-        for sentence in self.knowledge:
-            mines=safes=None
-            if len(sentence.cells)==sentence.count:
-                mines=sentence.known_mines()
-            elif sentence.count==0:
-                self.safes=sentence.known_safes()
-            if mines!= None:
-                self.mines=self.safes.union(mines)
-            if safes!=None:
-                self.safes=self.safes.union(safes)
-
-        for set1 in self.knowledge:
-            for set2 in self.knowledge:
-                if set1.cells!=set2.cells and set1.cells.issubset(set2.cells):
-                    cells=set2.cells-set1.cells
-                    count=set2.count-set1.count
-                    sentence=Sentence(cells,count)
-                    if sentence not in self.knowledge:
-                        self.knowledge.append(sentence)
+                count -= 1
+            elif neighbour not in self.safes:
+                cells.add(neighbour)
+        self.add_sentence(Sentence(cells, count))
+        self.infer()
 
+    def infer(self):
+        """
+        Draws every conclusion from the sentences added or changed
+        since the last call, and from any they lead to in turn.
+
+        A sentence whose cells are all mines or all safe is marked
+        through. Otherwise it is compared only with sentences that share
+        a cell with it: if one's cells are a subset of the other's, the
+        larger sentence is replaced by the difference of the two, which
+        together with the smaller one says the same thing.
+        """
+        while self.pending:
+            cells = self.pending.pop()
+            sentence = self.knowledge.get(cells)
+            if sentence is None:
+                continue
+
+            mines = sentence.known_mines()
+            safes = sentence.known_safes()
+            if mines or safes:
+                for cell in mines:
+                    self.mark_mine(cell)
+                for cell in safes:
+                    self.mark_safe(cell)
+                continue
+
+            overlapping = set()
+            for cell in cells:
+                overlapping |= self.index[cell]
+            overlapping.discard(cells)
+            for other in overlapping:
+                if cells not in self.knowledge:
+                    break
+                if other not in self.knowledge:
+                    continue
+                if cells < other:
+                    subset, superset = cells, other
+                elif other < cells:
+                    subset, superset = other, cells
+                else:
+                    continue
+                count = (self.knowledge[superset].count
+                         - self.knowledge[subset].count)
+                self.remove_sentence(superset)
+                self.add_sentence(Sentence(superset - subset, count))
 
     def make_safe_move(self):
         """
@@ -244,10 +319,7 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        for cell in self.safes:
-            if cell not in self.moves_made:
-                return cell
-        return None
+        return next(iter(self.safe_moves), None)
 
     def make_random_move(self):
         """